@@ -1,11 +1,19 @@
-from django.contrib import admin
-from .models import Category, Product, Order, OrderItem, Profile, CartItem, ContactMessage, Review, Wishlist
+from django.contrib import admin, messages
+from .models import (
+    Category, Product, ProductSize, Order, OrderItem, Profile, CartItem, ContactMessage, Review, Wishlist,
+    InventorySnapshot, RestockAlert, ArchivedOrder, ArchivedOrderItem, Promotion, AuditEvent,
+)
+from .order_transitions import InvalidTransition, transition_orders, update_order_status
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug']
     prepopulated_fields = {'slug': ('name',)}
 
+class ProductSizeInline(admin.TabularInline):
+    model = ProductSize
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['title', 'category', 'price', 'stock_quantity', 'is_featured']
@@ -13,17 +21,40 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description']
     prepopulated_fields = {'slug': ('title',)}
     list_editable = ['stock_quantity', 'is_featured']
+    inlines = [ProductSizeInline]
+
+def transition_action(status, label):
+    def mark(modeladmin, request, queryset):
+        # One UPDATE for the whole selection; orders that can't move there are left alone.
+        result = transition_orders(queryset.values_list('pk', flat=True), status)
+        modeladmin.message_user(request, f"{len(result.updated)} order(s) marked {label.lower()}.", messages.SUCCESS)
+        if result.skipped:
+            modeladmin.message_user(
+                request,
+                f"{len(result.skipped)} order(s) skipped: their status can't change to {label.lower()}.",
+                messages.WARNING,
+            )
+
+    mark.__name__ = f'mark_{status}'
+    mark.short_description = f'Mark selected orders as {label.lower()}'
+    mark.allowed_permissions = ('change',)
+    return mark
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    actions = [
+        transition_action(status, label)
+        for status, label in Order.STATUS_CHOICES
+        if Order.statuses_leading_to(status)
+    ]
     list_display = ['id', 'user', 'status', 'total_amount', 'payment_verified', 'created_at']
     list_filter = ['status', 'payment_verified', 'created_at']
     search_fields = ['user__email', 'user__username', 'shipping_name']
-    readonly_fields = ['created_at', 'total_amount']
+    readonly_fields = ['created_at', 'total_amount', 'coupon_code', 'discount_amount']
     list_editable = ['status', 'payment_verified']
     fieldsets = (
         ('Order Info', {
-            'fields': ('user', 'status', 'total_amount', 'created_at')
+            'fields': ('user', 'status', 'total_amount', 'coupon_code', 'discount_amount', 'created_at')
         }),
         ('Shipping Details', {
             'fields': ('shipping_name', 'shipping_phone', 'shipping_address', 'shipping_city', 'shipping_state', 'shipping_pincode')
@@ -33,6 +64,45 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Status edits (change form and list_editable) follow Order.TRANSITIONS; canceling restocks.
+        if change and 'status' in form.changed_data:
+            status, obj.status = obj.status, form.initial['status']
+            try:
+                update_order_status(obj, status)
+            except InvalidTransition as exc:
+                self.message_user(request, f"Order #{obj.pk}: {exc}", messages.ERROR)
+        super().save_model(request, obj, form, change)
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    readonly_fields = ['product', 'size', 'quantity', 'price']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders moved out of the hot tables by archive_orders."""
+    list_display = ['id', 'user', 'status', 'total_amount', 'created_at', 'archived_at']
+    list_filter = ['status']
+    list_select_related = ['user']
+    search_fields = ['=id', 'user__email', 'user__username']
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product', 'size', 'quantity', 'price']
@@ -77,3 +147,41 @@ class WishlistAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'product__title']
     readonly_fields = ['added_at']
 
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'product_count', 'total_units', 'low_stock_count', 'out_of_stock_count']
+    list_filter = ['created_at']
+    readonly_fields = ['created_at']
+
+@admin.register(RestockAlert)
+class RestockAlertAdmin(admin.ModelAdmin):
+    list_display = ['id', 'snapshot', 'created_at', 'sent_at']
+    list_filter = ['created_at']
+    readonly_fields = ['created_at']
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'kind', 'value', 'product', 'category', 'priority', 'is_active', 'starts_at', 'ends_at']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name', 'code']
+    list_editable = ['is_active']
+    raw_id_fields = ['product']
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    """Append-only: events are written by api/audit.py and never edited."""
+    list_display = ['created_at', 'entity_type', 'entity_id', 'action', 'actor', 'source']
+    list_filter = ['entity_type', 'action']
+    list_select_related = ['actor']
+    search_fields = ['=entity_id', 'actor__username', 'source']
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
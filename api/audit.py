@@ -0,0 +1,119 @@
+"""
+Append-only audit trail for orders, product stock and reviews.
+
+Saves and deletes of the audited models (``AUDIT_FIELDS`` on each) are turned
+into ``AuditEvent`` rows by signal handlers. Events are not written one by one:
+each joins the current batch once its transaction commits (rolled-back changes
+leave no trace), and the batch is written with a single ``bulk_create`` when it
+closes. ``AuditMiddleware`` opens one batch per request and attributes its
+events to the request's user; ``audit_batch()`` does the same for commands and
+bulk operations. An event outside any batch is written on its own.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+_batch = ContextVar("audit_batch", default=None)
+
+
+class AuditBatch:
+    def __init__(self, actor=None, source=""):
+        self.actor = actor
+        self.source = source
+        self.events = []
+
+    def flush(self):
+        events = self.events
+        actor = self.actor() if callable(self.actor) else self.actor
+        actor_id = actor.pk if actor is not None and actor.is_authenticated else None
+        for event in events:
+            if event.actor_id is None:
+                event.actor_id = actor_id
+            event.source = event.source or self.source
+        if events:
+            AuditEvent.objects.bulk_create(events)
+        self.events = []
+        return events
+
+
+@contextmanager
+def audit_batch(actor=None, source=""):
+    """Collect the events recorded inside the block and write them in one INSERT at the end."""
+    batch = AuditBatch(actor, source)
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+        batch.flush()
+
+
+def _collect(event):
+    batch = _batch.get()
+    if batch is None:
+        AuditEvent.objects.bulk_create([event])
+    else:
+        batch.events.append(event)
+
+
+def record(entity_type, entity_id, action, changes, actor=None):
+    event = AuditEvent(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        changes=changes,
+        actor=actor,
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: _collect(event))
+
+
+def record_save(instance, created):
+    fields = type(instance).AUDIT_FIELDS
+    current = {name: getattr(instance, name) for name in fields}
+    if created:
+        changes = {name: [None, value] for name, value in current.items()}
+    else:
+        loaded = getattr(instance, "_audit_loaded", {})
+        changes = {
+            name: [loaded.get(name), value]
+            for name, value in current.items()
+            if name not in loaded or loaded[name] != value
+        }
+    instance._audit_loaded = current
+    if changes:
+        record(instance._meta.model_name, instance.pk, "create" if created else "update", changes)
+
+
+def record_delete(instance):
+    fields = type(instance).AUDIT_FIELDS
+    record(instance._meta.model_name, instance.pk, "delete", {name: [getattr(instance, name), None] for name in fields})
+
+
+class AuditMiddleware:
+    """One audit batch per request, attributed to the request's user."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # The user is read when the batch is written: DRF authenticates (JWT) inside
+        # the view and copies the user onto the Django request.
+        batch = AuditBatch(actor=lambda: getattr(request, "user", None), source=f"{request.method} {request.path}"[:200])
+        token = _batch.set(batch)
+        try:
+            return self.get_response(request)
+        finally:
+            _batch.reset(token)
+            try:
+                batch.flush()
+            except Exception:
+                # The request's own changes are already committed; don't turn it into an error.
+                logger.exception("Writing %d audit event(s) failed", len(batch.events))
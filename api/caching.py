@@ -0,0 +1,87 @@
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .catalog import catalog_version
+from .compression import compress
+from .metrics import metrics
+
+# Entries are keyed by catalog version, so this only bounds how long unreachable
+# entries from older versions linger.
+CATALOG_RESPONSE_TIMEOUT = 60 * 60
+
+
+class CachedResponse:
+    """A rendered catalog response plus the compressed variants produced for it so far."""
+
+    def __init__(self, key, content, headers):
+        self.key = key
+        self.content = content
+        self.headers = headers
+        self.variants = {}
+
+    def variant(self, encoding):
+        """Compressed body for ``encoding``; compressed once, then stored with the entry."""
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.content, encoding, cached=True)
+            cache.set(self.key, self, CATALOG_RESPONSE_TIMEOUT)
+        return body
+
+    def to_response(self):
+        response = HttpResponse(self.content)
+        for header, value in self.headers.items():
+            response[header] = value
+        response.cache_entry = self
+        return response
+
+
+class CatalogCacheMixin:
+    """
+    Serve the viewset's ``catalog_cache_actions`` from the cache, keyed by catalog
+    version, host, path and the ``catalog_cache_params`` in the query string.
+    Only public JSON GET responses are cached; a hit skips the view entirely.
+
+    Other query params are left out of the key, so junk params can't fill the
+    cache with copies: ``catalog_cache_params`` must list every param the cached
+    actions read.
+    """
+    catalog_cache_actions = ()
+    catalog_cache_params = ()
+
+    def get_catalog_cache_key(self, request):
+        if request.method != 'GET' or self.action_map.get('get') not in self.catalog_cache_actions:
+            return None
+        # Browsable API and ?format= responses are negotiated differently; don't cache them.
+        if 'format' in request.GET or 'text/html' in request.META.get('HTTP_ACCEPT', ''):
+            return None
+        params = sorted(
+            (name, value) for name in self.catalog_cache_params for value in request.GET.getlist(name)
+        )
+        raw = f"{request.get_host()}{request.path}?{urlencode(params)}"
+        return f"catalog-response:{catalog_version()}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self.get_catalog_cache_key(request)
+        if key is not None:
+            entry = cache.get(key)
+            metrics.cache_lookup('catalog_response', entry is not None)
+            if entry is not None:
+                return entry.to_response()
+            # A lagging replica could still return pre-write data here, and it would be
+            # cached under the version already bumped for that write. Misses read the primary.
+            self.require_primary = True
+        response = super().dispatch(request, *args, **kwargs)
+        if key is not None and response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(partial(self._store_response, key))
+        return response
+
+    @staticmethod
+    def _store_response(key, response):
+        headers = {header: value for header, value in response.items() if header != 'Content-Length'}
+        entry = CachedResponse(key, response.content, headers)
+        cache.set(key, entry, CATALOG_RESPONSE_TIMEOUT)
+        response.cache_entry = entry
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+def catalog_version():
+    """
+    Current catalog version, bumped whenever products, categories or reviews change.
+
+    Cached catalog data is keyed by this version, so a bump makes every cached
+    entry unreachable at once. A missing key (eviction, cache restart) is seeded
+    from the clock so it never falls back to a version that is still cached.
+    Without a shared cache the key expires after CATALOG_VERSION_TIMEOUT, which
+    bounds how long other workers miss a bump.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        seed = time.time_ns() // 1000
+        cache.add(CATALOG_VERSION_KEY, seed, settings.CATALOG_VERSION_TIMEOUT)
+        version = cache.get(CATALOG_VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def catalog_changed():
+    # Bump now so this request (and the admin) stop reading stale entries, and again
+    # after commit so nothing cached from pre-commit data survives under the new version.
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,45 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+# (dynamic, cached) levels: cached bodies are compressed once per catalog
+# version, so they can afford denser settings (brotli 9+ gets too slow for a
+# request path: quality 11 takes seconds on a full product list).
+GZIP_LEVELS = (6, 9)
+BROTLI_QUALITIES = (4, 8)
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """Pick the best supported content coding from an Accept-Encoding header, or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available_encodings():  # preference order breaks ties
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, encoding, cached=False):
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITIES[cached])
+    # mtime=0 keeps the output deterministic for identical content
+    return gzip.compress(content, compresslevel=GZIP_LEVELS[cached], mtime=0)
@@ -0,0 +1,30 @@
+"""PostgreSQL backend that records connection metrics (see api/db_metrics.py)."""
+import time
+
+from django.db.backends.postgresql import base
+
+from api.db_metrics import connection_metrics
+
+
+def _ssl_in_use(connection):
+    try:
+        return bool(connection.pgconn.ssl_in_use)
+    except AttributeError:
+        return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        if getattr(self, "pool", None) is None:
+            connection_metrics.connection_opened(self.alias, connection, _ssl_in_use(connection))
+        connection_metrics.checked_out(self.alias, time.perf_counter() - start)
+        return connection
+
+    def _configure_connection(self, connection):
+        # Called by the psycopg pool for every physical connection it opens, and by
+        # init_connection_state() for the connection just checked out (not counted).
+        if connection is not self.connection:
+            connection_metrics.connection_opened(self.alias, connection, _ssl_in_use(connection))
+        return super()._configure_connection(connection)
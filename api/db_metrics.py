@@ -0,0 +1,97 @@
+"""
+In-process database connection metrics.
+
+The instrumented PostgreSQL backend (``api.db_backends.postgresql``) reports
+every checkout (a new connection for Django: a physical connect, or a pool
+``getconn()`` in pooled mode) and every physical connection it opens.
+"""
+import time
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections
+
+
+class _AliasStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.connections_opened = 0
+        self.ssl_handshakes = 0
+
+
+class ConnectionMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self._stats = defaultdict(_AliasStats)
+        self._open = {}  # id(connection) -> (connection, alias, opened_at)
+
+    def connection_opened(self, alias, connection, ssl):
+        with self._lock:
+            stats = self._stats[alias]
+            stats.connections_opened += 1
+            stats.ssl_handshakes += bool(ssl)
+            self._prune()
+            self._open[id(connection)] = (connection, alias, time.monotonic())
+
+    def checked_out(self, alias, seconds):
+        with self._lock:
+            stats = self._stats[alias]
+            stats.checkouts += 1
+            stats.checkout_wait_total += seconds
+            stats.checkout_wait_max = max(stats.checkout_wait_max, seconds)
+
+    def _prune(self):
+        for key in [key for key, (connection, _, _) in self._open.items() if connection.closed]:
+            del self._open[key]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            self._prune()
+            ages = defaultdict(list)
+            for _, alias, opened_at in self._open.values():
+                ages[alias].append(now - opened_at)
+            result = {}
+            for alias, stats in self._stats.items():
+                alias_ages = ages.get(alias, [])
+                result[alias] = {
+                    "checkouts": stats.checkouts,
+                    "checkout_wait_ms": {
+                        "total": round(stats.checkout_wait_total * 1000, 3),
+                        "max": round(stats.checkout_wait_max * 1000, 3),
+                        "avg": round(stats.checkout_wait_total * 1000 / stats.checkouts, 3) if stats.checkouts else 0,
+                    },
+                    "connections_opened": stats.connections_opened,
+                    "ssl_handshakes": stats.ssl_handshakes,
+                    "open_connections": len(alias_ages),
+                    "connection_age_seconds": {
+                        "max": round(max(alias_ages), 1) if alias_ages else 0,
+                        "avg": round(sum(alias_ages) / len(alias_ages), 1) if alias_ages else 0,
+                    },
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._open.clear()
+
+
+connection_metrics = ConnectionMetrics()
+
+
+def database_metrics():
+    """Connection metrics and (in pooled mode) psycopg pool stats for every configured database."""
+    recorded = connection_metrics.snapshot()
+    result = {}
+    for alias in settings.DATABASES:
+        entry = recorded.get(alias, {})
+        pool = getattr(connections[alias], "pool", None)
+        entry["pooled"] = pool is not None
+        if pool is not None:
+            entry["pool"] = pool.get_stats()
+        result[alias] = entry
+    return result
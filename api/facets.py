@@ -0,0 +1,163 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Subquery
+from rest_framework.exceptions import ValidationError
+
+from .models import ProductSize, Review
+
+# Price buckets shown in the filter sidebar: (key, lower bound inclusive, upper bound exclusive).
+PRICE_RANGES = [
+    ("0-500", None, 500),
+    ("500-1000", 500, 1000),
+    ("1000-2000", 1000, 2000),
+    ("2000-5000", 2000, 5000),
+    ("5000+", 5000, None),
+]
+RATING_FLOORS = [4, 3, 2, 1]
+SIZES = [code for code, _ in ProductSize.SIZE_CHOICES]
+
+
+def _size_alias(code):
+    return f"_has_size_{code.lower()}"
+
+
+def _price_bucket_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+class ProductFacets:
+    """
+    Faceted filtering for the product list.
+
+    Parses the facet query params (``min_price``, ``max_price``, ``size``,
+    ``min_rating``, ``featured``), applies them to a queryset and computes the
+    sidebar counts for every facet value with a single aggregate query.
+
+    Counts follow the usual sidebar semantics: a facet value's count respects
+    every active filter except the one on its own facet, so selecting ``size=M``
+    still shows how many products come in ``L``.
+    """
+
+    def __init__(self, params):
+        self.min_price = self._decimal(params, "min_price")
+        self.max_price = self._decimal(params, "max_price")
+        self.min_rating = self._rating(params)
+        self.featured = params.get("featured") == "true"
+        sizes = params.get("size")
+        self.sizes = [s for s in sizes.upper().split(",") if s in SIZES] if sizes else []
+
+    @staticmethod
+    def _decimal(params, name):
+        value = params.get(name)
+        if value in (None, ""):
+            return None
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: "A valid number is required."})
+
+    @staticmethod
+    def _rating(params):
+        value = params.get("min_rating")
+        if value in (None, ""):
+            return None
+        try:
+            rating = int(value)
+        except ValueError:
+            raise ValidationError({"min_rating": "A whole number between 1 and 5 is required."})
+        if not 1 <= rating <= 5:
+            raise ValidationError({"min_rating": "A whole number between 1 and 5 is required."})
+        return rating
+
+    def _alias(self, queryset):
+        """Attach the derived facet columns; ``alias()`` keeps them out of the SELECT list."""
+        average = (
+            Review.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(avg=Avg("rating"))
+            .values("avg")
+        )
+        return queryset.alias(_avg_rating=Subquery(average[:1]), **self._size_columns())
+
+    @staticmethod
+    def _size_columns():
+        return {
+            _size_alias(code): Exists(ProductSize.objects.filter(product=OuterRef("pk"), size=code))
+            for code in SIZES
+        }
+
+    def _active_filters(self):
+        """Map each facet to the Q for its currently selected values (if any)."""
+        active = {}
+        price = Q()
+        if self.min_price is not None:
+            price &= Q(price__gte=self.min_price)
+        if self.max_price is not None:
+            price &= Q(price__lte=self.max_price)
+        if price:
+            active["price"] = price
+        if self.sizes:
+            sizes = Q()
+            for code in self.sizes:
+                sizes |= Q(**{_size_alias(code): True})
+            active["size"] = sizes
+        if self.min_rating is not None:
+            active["rating"] = Q(_avg_rating__gte=self.min_rating)
+        if self.featured:
+            active["featured"] = Q(is_featured=True)
+        return active
+
+    @property
+    def is_active(self):
+        return bool(self._active_filters())
+
+    def filter(self, queryset):
+        active = self._active_filters()
+        if not active:
+            return queryset
+        queryset = self._alias(queryset)
+        for q in active.values():
+            queryset = queryset.filter(q)
+        return queryset
+
+    def counts(self, queryset):
+        """Return facet counts for ``queryset`` (the list *before* facet filters) in one query."""
+        active = self._active_filters()
+
+        def others(facet):
+            q = Q()
+            for name, condition in active.items():
+                if name != facet:
+                    q &= condition
+            return q
+
+        buckets = []
+        for key, low, high in PRICE_RANGES:
+            buckets.append(("price", key, _price_bucket_q(low, high) & others("price")))
+        for code in SIZES:
+            buckets.append(("size", code, Q(**{_size_alias(code): True}) & others("size")))
+        for floor in RATING_FLOORS:
+            buckets.append(("rating", str(floor), Q(_avg_rating__gte=floor) & others("rating")))
+        buckets.append(("featured", None, Q(is_featured=True) & others("featured")))
+        buckets.append(("total", None, Q(pk__isnull=False) & others(None)))
+
+        # Avg() makes the derived columns an aggregate annotation, so Django evaluates them
+        # once per product in a grouped inner query and counts every bucket over that.
+        derived = queryset.order_by().annotate(_avg_rating=Avg("reviews__rating"), **self._size_columns())
+        row = derived.aggregate(
+            **{f"facet_{i}": Count("pk", filter=q) for i, (_, _, q) in enumerate(buckets)}
+        )
+
+        facets = {"price": {}, "size": {}, "rating": {}}
+        for i, (facet, value, _) in enumerate(buckets):
+            if value is None:
+                facets[facet] = row[f"facet_{i}"]
+            else:
+                facets[facet][value] = row[f"facet_{i}"]
+        return facets
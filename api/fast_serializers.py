@@ -0,0 +1,182 @@
+"""
+Compiled read-only list serialization for the hot catalog endpoints.
+
+A ``CompiledListSerializer`` walks its DRF ``serializer_class`` once and turns
+the declared fields into a flat plan of ``.values()`` columns and converters.
+Rows are then turned into dicts directly, skipping DRF's per-field
+``get_attribute``/``to_representation`` dispatch. The output is identical to
+``serializer_class(queryset, many=True, context=...).data``.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from .models import Review
+from .serializers import CategorySerializer, ProductSerializer
+
+# Fields whose to_representation is an identity for the values the database returns.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class _Plan:
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+        self.pk_column = prefix + model._meta.pk.attname
+        self.columns = [self.pk_column]
+        self.entries = []  # (key, kind, payload)
+
+    def add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+
+
+def compile_serializer(serializer, prefix=""):
+    """Build the field plan for a (non-``many``) ModelSerializer instance."""
+    plan = _Plan(serializer.Meta.model, prefix)
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        column = prefix + "__".join(field.source_attrs)
+        if isinstance(field, serializers.SerializerMethodField):
+            plan.entries.append((name, "method", field.method_name))
+        elif isinstance(field, serializers.ListSerializer) or getattr(field, "many", False):
+            raise ImproperlyConfigured(f"Cannot compile to-many field '{name}'.")
+        elif isinstance(field, serializers.ModelSerializer):
+            nested = compile_serializer(field, prefix=column + "__")
+            plan.columns.extend(c for c in nested.columns if c not in plan.columns)
+            plan.entries.append((name, "nested", nested))
+        elif isinstance(field, serializers.FileField):
+            if not getattr(field, "use_url", True):
+                plan.add_column(column)
+                plan.entries.append((name, "column", (column, lambda file_name: file_name or None)))
+                continue
+            storage = plan.model._meta.get_field(field.source).storage
+            plan.add_column(column)
+            plan.entries.append((name, "file", (column, storage)))
+        elif isinstance(field, PASSTHROUGH_FIELDS):
+            plan.add_column(column)
+            plan.entries.append((name, "column", (column, None)))
+        elif isinstance(field, serializers.Field) and not isinstance(field, serializers.RelatedField):
+            plan.add_column(column)
+            plan.entries.append((name, "column", (column, field.to_representation)))
+        else:
+            raise ImproperlyConfigured(f"Cannot compile field '{name}' ({type(field).__name__}).")
+    return plan
+
+
+class CompiledListSerializer:
+    """Read-only, many=True fast path for ``serializer_class``."""
+    serializer_class = None
+    # Extra annotations the ``get_<name>`` method fields read from the row. Use
+    # subqueries rather than joined aggregates: GROUP BY would drop Meta.ordering.
+    annotations = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @classmethod
+    def get_plan(cls):
+        if "_plan" not in cls.__dict__:
+            cls._plan = compile_serializer(cls.serializer_class())
+            for missing in cls._method_names(cls._plan) - set(dir(cls)):
+                raise ImproperlyConfigured(f"{cls.__name__} must define {missing}(row).")
+        return cls._plan
+
+    @classmethod
+    def _method_names(cls, plan):
+        names = set()
+        for _, kind, payload in plan.entries:
+            if kind == "method":
+                names.add(payload)
+            elif kind == "nested":
+                names |= cls._method_names(payload)
+        return names
+
+    def _getters(self, plan):
+        request = self.context.get("request")
+        getters = []
+        for key, kind, payload in plan.entries:
+            if kind == "column":
+                column, convert = payload
+                if convert is None:
+                    getter = itemgetter(column)
+                else:
+                    def getter(row, column=column, convert=convert):
+                        value = row[column]
+                        return None if value is None else convert(value)
+            elif kind == "file":
+                column, storage = payload
+
+                def getter(row, column=column, storage=storage):
+                    name = row[column]
+                    if not name:
+                        return None
+                    url = storage.url(name)
+                    return request.build_absolute_uri(url) if request is not None else url
+            elif kind == "nested":
+                getter = self._builder(payload, nested=True)
+            else:
+                getter = getattr(self, payload)
+            getters.append((key, getter))
+        return getters
+
+    def _builder(self, plan, nested=False):
+        getters = self._getters(plan)
+        pk_column = plan.pk_column
+
+        def build(row):
+            if nested and row[pk_column] is None:
+                return None
+            return {key: getter(row) for key, getter in getters}
+        return build
+
+    def get_rows(self, queryset):
+        queryset = queryset.prefetch_related(None)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset.values(*self.get_plan().columns, *self.annotations)
+
+    def to_representation(self, queryset):
+        build = self._builder(self.get_plan())
+        return [build(row) for row in self.get_rows(queryset)]
+
+
+class CompiledCategorySerializer(CompiledListSerializer):
+    serializer_class = CategorySerializer
+
+
+def _per_product_reviews(aggregate):
+    reviews = Review.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    return Coalesce(Subquery(reviews.annotate(value=aggregate).values("value")), 0)
+
+
+class CompiledProductSerializer(CompiledListSerializer):
+    serializer_class = ProductSerializer
+    annotations = {
+        "_rating_total": _per_product_reviews(Sum("rating")),
+        "_review_count": _per_product_reviews(Count("id")),
+    }
+
+    def get_average_rating(self, row):
+        if row["_review_count"]:
+            return round(row["_rating_total"] / row["_review_count"], 1)
+        return 0
+
+    def get_review_count(self, row):
+        return row["_review_count"]
+
+    def get_in_stock(self, row):
+        return row["stock_quantity"] > 0
+
+    def get_low_stock(self, row):
+        return 0 < row["stock_quantity"] <= row["low_stock_threshold"]
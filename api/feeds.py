@@ -0,0 +1,243 @@
+"""
+Precomputed product feeds and sitemaps for shopping crawlers and search engines.
+
+``build_feeds`` streams the catalog once (``.iterator()`` over plain value rows,
+no serializers or review aggregates) into gzip files under
+``settings.FEED_ROOT``:
+
+- ``products.xml.gz``     RSS 2.0 product feed with Google Merchant ``g:`` fields
+- ``products.jsonl.gz``   one JSON object per product
+- ``sitemap-<n>.xml.gz``  category and product pages, at most 50,000 URLs each
+- ``sitemap.xml``         sitemap index pointing at the chunks
+- ``feeds.json``          manifest: catalog version, counts, generation time
+
+Every file is written to a temporary name and moved into place, so a crawler
+never sees a half-written feed. The build is skipped while the manifest's
+catalog version is current. ``FeedFilesMiddleware`` serves the directory at
+``settings.FEED_URL`` through WhiteNoise, so crawls cost no queries.
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+from whitenoise import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .catalog import catalog_version
+from .models import Category, Product
+
+MANIFEST = "feeds.json"
+SITEMAP_INDEX = "sitemap.xml"
+# Sitemap protocol limit per file
+SITEMAP_MAX_URLS = 50_000
+CHUNK_SIZE = 2000
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def read_manifest(root=None):
+    try:
+        with open(Path(root or settings.FEED_ROOT) / MANIFEST, encoding="utf-8") as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+def _open_atomic(path):
+    """Text handle for ``path`` (gzip-compressed for .gz) written under a temporary name."""
+    tmp = f"{path}.tmp"
+    handle = gzip.open(tmp, "wt", encoding="utf-8") if path.suffix == ".gz" else open(tmp, "w", encoding="utf-8")
+    return handle, tmp
+
+
+class _AtomicFiles:
+    """Files of one build; moved into place together by ``commit()``, discarded otherwise."""
+
+    def __init__(self, root):
+        self.root = root
+        self.pending = []
+
+    def open(self, name):
+        path = self.root / name
+        handle, tmp = _open_atomic(path)
+        self.pending.append((handle, tmp, path))
+        return handle
+
+    def commit(self):
+        for handle, tmp, path in self.pending:
+            handle.close()
+        for handle, tmp, path in self.pending:
+            os.replace(tmp, path)
+        self.pending = []
+
+    def discard(self):
+        for handle, tmp, path in self.pending:
+            handle.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.pending = []
+
+
+class _SitemapWriter:
+    def __init__(self, files):
+        self.files = files
+        self.names = []
+        self.handle = None
+        self.count = 0
+
+    def add(self, loc):
+        if self.handle is None or self.count == SITEMAP_MAX_URLS:
+            self._next_chunk()
+        self.handle.write(f"<url><loc>{escape(loc)}</loc></url>\n")
+        self.count += 1
+
+    def _next_chunk(self):
+        self.close()
+        self.names.append(f"sitemap-{len(self.names) + 1}.xml.gz")
+        self.handle = self.files.open(self.names[-1])
+        self.handle.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        self.count = 0
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.write("</urlset>\n")
+            self.handle = None
+
+
+def _absolute_media_url(name):
+    if not name:
+        return ""
+    return urljoin(settings.API_URL, Product._meta.get_field("image").storage.url(name))
+
+
+def _rss_item(row, link, image_link):
+    fields = [
+        ("g:id", row["id"]),
+        ("g:title", row["title"]),
+        ("g:description", row["description"] or row["title"]),
+        ("g:link", link),
+        ("g:price", f"{row['price']} {settings.FEED_CURRENCY}"),
+        ("g:availability", "in_stock" if row["stock_quantity"] > 0 else "out_of_stock"),
+        ("g:product_type", row["category__name"]),
+        ("g:condition", "new"),
+    ]
+    if image_link:
+        fields.append(("g:image_link", image_link))
+    return "<item>" + "".join(f"<{tag}>{escape(str(value))}</{tag}>" for tag, value in fields) + "</item>\n"
+
+
+def build_feeds(root=None, force=False):
+    """
+    Regenerate the feed files unless they already match the current catalog
+    version. Returns the new manifest, or None when the build was skipped.
+    """
+    root = Path(root or settings.FEED_ROOT)
+    version = catalog_version()
+    manifest = read_manifest(root)
+    if not force and manifest and manifest["version"] == version and all(
+        (root / name).exists() for name in manifest["files"]
+    ):
+        return None
+    root.mkdir(parents=True, exist_ok=True)
+    previous_files = set(manifest["files"]) if manifest else set()
+
+    files = _AtomicFiles(root)
+    try:
+        rss = files.open("products.xml.gz")
+        rss.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>\n'
+            f"<title>UrbanFashion products</title><link>{escape(settings.SITE_URL)}</link>"
+            "<description>UrbanFashion product feed</description>\n"
+        )
+        jsonl = files.open("products.jsonl.gz")
+        sitemap = _SitemapWriter(files)
+
+        categories = 0
+        for slug in Category.objects.order_by("id").values_list("slug", flat=True).iterator(chunk_size=CHUNK_SIZE):
+            sitemap.add(urljoin(settings.SITE_URL, settings.SITE_CATEGORY_PATH.format(slug=slug)))
+            categories += 1
+
+        products = 0
+        rows = Product.objects.order_by("id").values(
+            "id", "title", "slug", "description", "price", "stock_quantity", "image",
+            "category__name", "category__slug",
+        )
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            link = urljoin(settings.SITE_URL, settings.SITE_PRODUCT_PATH.format(slug=row["slug"]))
+            image_link = _absolute_media_url(row["image"])
+            rss.write(_rss_item(row, link, image_link))
+            jsonl.write(json.dumps({
+                "id": row["id"],
+                "title": row["title"],
+                "description": row["description"],
+                "link": link,
+                "image_link": image_link or None,
+                "price": str(row["price"]),
+                "currency": settings.FEED_CURRENCY,
+                "in_stock": row["stock_quantity"] > 0,
+                "category": row["category__slug"],
+            }, ensure_ascii=False) + "\n")
+            sitemap.add(link)
+            products += 1
+
+        rss.write("</channel></rss>\n")
+        sitemap.close()
+
+        generated_at = timezone.now().isoformat()
+        index = files.open(SITEMAP_INDEX)
+        index.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        for name in sitemap.names:
+            loc = urljoin(settings.API_URL, settings.FEED_URL + name)
+            index.write(f"<sitemap><loc>{escape(loc)}</loc><lastmod>{generated_at}</lastmod></sitemap>\n")
+        index.write("</sitemapindex>\n")
+
+        manifest = {
+            "version": version,
+            "generated_at": generated_at,
+            "products": products,
+            "categories": categories,
+            "files": ["products.xml.gz", "products.jsonl.gz", *sitemap.names, SITEMAP_INDEX],
+        }
+        files.open(MANIFEST).write(json.dumps(manifest, indent=2))
+        files.commit()
+    except BaseException:
+        files.discard()
+        raise
+
+    # Sitemap chunks the catalog no longer fills
+    for name in previous_files - set(manifest["files"]):
+        try:
+            os.remove(root / name)
+        except FileNotFoundError:
+            pass
+    return manifest
+
+
+class FeedFilesMiddleware:
+    """
+    Serves ``settings.FEED_ROOT`` at ``settings.FEED_URL`` with its own WhiteNoise.
+
+    WhiteNoise normally indexes its files once at startup. Feeds are replaced
+    while the server runs, so this instance looks files up on each request
+    (autorefresh), which only costs a stat for requests under FEED_URL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.FEED_URL
+        self.files = WhiteNoise(
+            None, root=settings.FEED_ROOT, prefix=self.prefix, autorefresh=True, max_age=settings.FEED_MAX_AGE,
+        )
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefix):
+            static_file = self.files.find_file(request.path_info)
+            if static_file is not None:
+                return WhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
@@ -0,0 +1,102 @@
+"""
+Load balancer probes and the Prometheus scrape endpoint.
+
+These are plain Django views: they skip DRF authentication, throttling and
+content negotiation, and ``/healthz`` never touches the database.
+"""
+import hmac
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Applied migrations don't go away under a running process, so once the check
+# passes it is not repeated (building the migration graph reads every migration file).
+_migrations_applied = False
+
+
+def _check_database(alias):
+    start = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return {"latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def _check_migrations():
+    global _migrations_applied
+    if not _migrations_applied:
+        executor = MigrationExecutor(connections["default"])
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if pending:
+            raise RuntimeError(f"{len(pending)} unapplied migration(s)")
+        _migrations_applied = True
+    return {}
+
+
+def _check_cache():
+    key = f"readyz:{uuid.uuid4().hex}"
+    cache.set(key, 1, 10)
+    try:
+        if cache.get(key) != 1:
+            raise RuntimeError("value written to the cache could not be read back")
+    finally:
+        cache.delete(key)
+    return {}
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Liveness: the process is up and serving requests."""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Readiness: every database answers, migrations are applied and the cache works."""
+    checks = {f"database:{alias}": (_check_database, alias) for alias in settings.DATABASES}
+    checks["migrations"] = (_check_migrations,)
+    checks["cache"] = (_check_cache,)
+
+    results = {}
+    for name, (check, *args) in checks.items():
+        try:
+            results[name] = {"ok": True, **check(*args)}
+        except Exception:
+            # The probe is public and driver errors name hosts and users: details go to the log.
+            logger.exception("Readiness check %s failed", name)
+            results[name] = {"ok": False, "error": "check failed"}
+    ready = all(result["ok"] for result in results.values())
+    return JsonResponse(
+        {"status": "ok" if ready else "unavailable", "checks": results},
+        status=200 if ready else 503,
+    )
+
+
+def _has_metrics_token(request):
+    if not settings.METRICS_TOKEN:
+        return False
+    expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+    return hmac.compare_digest(request.META.get("HTTP_AUTHORIZATION", "").encode(), expected)
+
+
+@never_cache
+@require_safe
+def prometheus_metrics(request):
+    """Prometheus scrape, for ``Authorization: Bearer <METRICS_TOKEN>`` or a staff session."""
+    if not (_has_metrics_token(request) or request.user.is_staff):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,255 @@
+"""
+Scenario runner for ``manage.py loadtest``.
+
+Each virtual user is a thread with its own keep-alive HTTP connection. It
+registers and logs in, then loops until the deadline, or for a fixed number
+of iterations: browse the catalog, and on a share of the iterations
+(``checkout_ratio``) put a few products in
+the cart, price it, check out, verify the payment with a locally signed
+Razorpay signature and empty the cart. Every request is timed under an
+endpoint name. The report is plain JSON-serializable data: per endpoint
+request and error counts, throughput, latency percentiles and status codes.
+"""
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from .payments import sign
+
+PASSWORD = "Load-test-Passw0rd!"
+PERCENTILES = (50, 90, 95, 99)
+
+
+class RequestFailed(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+    def add(self, seconds, status, error):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error:
+            self.errors += 1
+
+    def merge(self, other):
+        self.latencies += other.latencies
+        self.errors += other.errors
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        latency_ms = {"mean": round(statistics.fmean(latencies) * 1000, 2) if count else None}
+        for percentile in PERCENTILES:
+            # Nearest rank
+            rank = max(-(-percentile * count // 100) - 1, 0)
+            latency_ms[f"p{percentile}"] = round(latencies[rank] * 1000, 2) if count else None
+        latency_ms["max"] = round(latencies[-1] * 1000, 2) if count else None
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": latency_ms,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items(), key=lambda item: str(item[0]))},
+        }
+
+
+class VirtualUser:
+    def __init__(self, base_url, catalog, rng, think_time=0.0, timeout=30):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.catalog = catalog
+        self.rng = rng
+        self.think_time = think_time
+        self.stats = {}
+        self.iterations = {"browse": 0, "checkout": 0, "failed": 0}
+        self.connection = None
+        self.token = None
+        self.username = f"lt-{uuid.uuid4().hex[:12]}"
+
+    # ----- HTTP -----
+
+    def request(self, name, method, path, data=None, params=None, expect=(200,)):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {"Accept": "application/json", "Accept-Encoding": "identity"}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as exc:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            self._record(name, time.perf_counter() - start, type(exc).__name__, True)
+            raise RequestFailed(f"{method} {path}: {exc}") from exc
+        self._record(name, time.perf_counter() - start, status, status not in expect)
+        if status not in expect:
+            raise RequestFailed(f"{method} {path}: HTTP {status}", status)
+        return json.loads(payload) if payload else None
+
+    def _record(self, name, seconds, status, error):
+        if name not in self.stats:
+            self.stats[name] = EndpointStats()
+        self.stats[name].add(seconds, status, error)
+
+    def pause(self):
+        if self.think_time:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+    # ----- Flows -----
+
+    def sign_up(self):
+        self.request("register", "POST", "/api/register/", {
+            "username": self.username, "email": f"{self.username}@example.com", "password": PASSWORD,
+        }, expect=(201,))
+        self.log_in()
+
+    def log_in(self):
+        self.token = None
+        tokens = self.request("login", "POST", "/api/token/", {"username": self.username, "password": PASSWORD})
+        self.token = tokens["access"]
+
+    def browse(self):
+        category = self.rng.choice(self.catalog["categories"])
+        self.request("categories", "GET", "/api/categories/")
+        self.request("product list", "GET", "/api/products/", params={"category": category, "facets": "true"})
+        self.request("featured", "GET", "/api/products/featured/")
+        self.request("suggest", "GET", "/api/products/suggest/", params={"q": self.rng.choice(self.catalog["queries"])})
+        for product_id in self.rng.sample(self.catalog["products"], 2):
+            self.pause()
+            self.request("product detail", "GET", f"/api/products/{product_id}/")
+            self.request("product reviews", "GET", f"/api/products/{product_id}/reviews/")
+
+    def checkout(self):
+        for product_id in self.rng.sample(self.catalog["products"], self.rng.randint(1, 3)):
+            self.request("cart add", "POST", "/api/cart/", {
+                "product_id": product_id, "size": "M", "quantity": self.rng.randint(1, 2),
+            }, expect=(201,))
+        self.pause()
+        cart = self.request("cart summary", "GET", "/api/cart/summary/")
+        order = self.request("checkout", "POST", "/api/orders/", {
+            "items": [
+                {"product_id": item["product_id"], "size": "M", "quantity": item["quantity"]}
+                for item in cart["items"]
+            ],
+        }, expect=(201,))
+        razorpay_order_id = f"order_{uuid.uuid4().hex[:14]}"
+        razorpay_payment_id = f"pay_{uuid.uuid4().hex[:14]}"
+        self.request("payment verify", "POST", "/api/razorpay/verify/", {
+            "order_id": order["id"],
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_payment_id": razorpay_payment_id,
+            "razorpay_signature": sign(razorpay_order_id, razorpay_payment_id, self.catalog["razorpay_secret"]),
+        })
+        for item in cart["items"]:
+            self.request("cart remove", "DELETE", f"/api/cart/{item['id']}/", expect=(204,))
+
+    def run(self, deadline, checkout_ratio, iterations=None):
+        """Loop until ``deadline`` (time.monotonic()), or ``iterations`` times when it is None."""
+        try:
+            self.sign_up()
+        except RequestFailed:
+            self.iterations["failed"] += 1
+            return
+        done = 0
+
+        def keep_going():
+            if deadline is None:
+                return done < iterations
+            return time.monotonic() < deadline
+
+        while keep_going():
+            done += 1
+            flow = "checkout" if self.rng.random() < checkout_ratio else "browse"
+            try:
+                self.browse()
+                if flow == "checkout":
+                    self.checkout()
+                self.iterations[flow] += 1
+            except RequestFailed as exc:
+                self.iterations["failed"] += 1
+                if exc.status == 401:  # the access token expired
+                    try:
+                        self.log_in()
+                    except RequestFailed:
+                        pass
+            self.pause()
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_load_test(
+    base_url, catalog, users=20, duration=30.0, ramp_up=5.0, checkout_ratio=0.5, think_time=0.0, seed=0,
+    iterations_per_user=None,
+):
+    """
+    Drive ``users`` virtual users against ``base_url`` for ``duration`` seconds,
+    or for ``iterations_per_user`` iterations each when given, and return the report.
+    ``catalog`` holds the product ids, category slugs and suggest queries to
+    pick from, and the Razorpay secret to sign payments with.
+    """
+    start = time.monotonic()
+    deadline = start + ramp_up + duration if iterations_per_user is None else None
+    virtual_users = [
+        VirtualUser(base_url, catalog, random.Random(seed * 100_003 + n), think_time=think_time)
+        for n in range(users)
+    ]
+    threads = []
+    for n, user in enumerate(virtual_users):
+        thread = threading.Thread(target=user.run, args=(deadline, checkout_ratio, iterations_per_user), daemon=True)
+        # Spread the starts over the ramp-up period
+        delay = start + ramp_up * n / max(users, 1) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    totals, endpoints = EndpointStats(), {}
+    iterations = {"browse": 0, "checkout": 0, "failed": 0}
+    for user in virtual_users:
+        for name, stats in user.stats.items():
+            endpoints.setdefault(name, EndpointStats()).merge(stats)
+            totals.merge(stats)
+        for flow, count in user.iterations.items():
+            iterations[flow] += count
+    return {
+        "base_url": base_url,
+        "users": users,
+        "duration_s": round(elapsed, 2),
+        "ramp_up_s": ramp_up,
+        "checkout_ratio": checkout_ratio,
+        "iterations": iterations,
+        "total": totals.summary(elapsed),
+        "endpoints": {name: stats.summary(elapsed) for name, stats in sorted(endpoints.items())},
+    }
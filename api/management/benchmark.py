@@ -0,0 +1,97 @@
+"""
+Shared plumbing for the ``benchmark_*`` management commands (``seed_catalog`` also
+seeds the ``loadtest`` database).
+
+Benchmarks run against a throwaway test database (the same one ``manage.py test``
+creates), so seeding a large catalog never touches real data.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.models import Category, Product, ProductSize, Review
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+
+def seed_catalog(products, categories=20, users=50, max_reviews=3):
+    """Bulk-insert a random catalog with sizes and reviews."""
+    sizes = [code for code, _ in ProductSize.SIZE_CHOICES]
+    with transaction.atomic():
+        category_objs = Category.objects.bulk_create(
+            [Category(name=f"Category {i}", slug=f"category-{i}") for i in range(categories)]
+        )
+        user_objs = User.objects.bulk_create(
+            [User(username=f"bench{i}", email=f"bench{i}@example.com") for i in range(users)]
+        )
+        for offset in range(0, products, BATCH_SIZE):
+            batch = Product.objects.bulk_create([
+                Product(
+                    title=f"Product {i}",
+                    slug=f"product-{i}",
+                    category=random.choice(category_objs),
+                    price=Decimal(random.randint(100, 800000)) / 100,
+                    description="Benchmark product",
+                    is_featured=random.random() < 0.05,
+                    stock_quantity=random.randint(0, 40),
+                )
+                for i in range(offset, min(offset + BATCH_SIZE, products))
+            ])
+            ProductSize.objects.bulk_create([
+                ProductSize(product=product, size=size)
+                for product in batch
+                for size in random.sample(sizes, random.randint(1, len(sizes)))
+            ])
+            Review.objects.bulk_create([
+                Review(product=product, user=user, rating=random.randint(1, 5))
+                for product in batch
+                for user in random.sample(user_objs, random.randint(0, max_reviews))
+            ])
+
+
+class BenchmarkCommand(BaseCommand):
+    default_products = 100_000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=self.default_products)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case; best and median are reported.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Same environment as the test runner: testserver host, in-memory email.
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            random.seed(options["seed"])
+            self.benchmark(**options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def benchmark(self, **options):
+        raise NotImplementedError
+
+    def timeit(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"{label:<44} best {min(timings):10.2f} ms   median {statistics.median(timings):10.2f} ms"
+        )
+        return timings
+
+    def seed_catalog(self, products, categories=20, users=50, max_reviews=3):
+        start = time.perf_counter()
+        seed_catalog(products, categories=categories, users=users, max_reviews=max_reviews)
+        self.stdout.write(f"Seeded {products} products in {time.perf_counter() - start:.1f} s")
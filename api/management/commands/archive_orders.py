@@ -0,0 +1,62 @@
+import calendar
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+# Copied column by column; archived_at is filled in by the archive itself.
+ORDER_COLUMNS = [f.attname for f in ArchivedOrder._meta.concrete_fields if f.name != "archived_at"]
+ITEM_COLUMNS = [f.attname for f in ArchivedOrderItem._meta.concrete_fields]
+
+
+def months_before(moment, months):
+    """``moment`` shifted back by calendar months, clamping the day (31 Mar - 1 month = 28/29 Feb)."""
+    year, month = divmod(moment.year * 12 + moment.month - 1 - months, 12)
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered and canceled orders older than --months (ORDER_ARCHIVE_AFTER_MONTHS) "
+        "with their items into the archive tables, one transaction per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=settings.ORDER_ARCHIVE_AFTER_MONTHS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many orders would move.")
+
+    def handle(self, *args, months, batch_size, dry_run, **options):
+        cutoff = months_before(timezone.now(), months)
+        finished = Order.objects.filter(status__in=Order.FINAL_STATUSES, created_at__lt=cutoff)
+        if dry_run:
+            self.stdout.write(f"{finished.count()} order(s) created before {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        archived = 0
+        while True:
+            with transaction.atomic():
+                # Lock the batch so a concurrent status edit can't be lost; skip rows already locked.
+                ids = list(
+                    finished.select_for_update(skip_locked=True)
+                    .order_by("id")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                ArchivedOrder.objects.bulk_create(
+                    ArchivedOrder(**row) for row in Order.objects.filter(id__in=ids).values(*ORDER_COLUMNS)
+                )
+                items = OrderItem.objects.filter(order_id__in=ids)
+                ArchivedOrderItem.objects.bulk_create(ArchivedOrderItem(**row) for row in items.values(*ITEM_COLUMNS))
+                items.delete()
+                Order.objects.filter(id__in=ids).delete()
+            archived += len(ids)
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Archived {archived} order(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} order(s) created before {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+
+from api.models import ArchivedOrderItem, OrderItem, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Review.verified_purchase from delivered (including archived) orders. Runs two set-based "
+        "UPDATEs per primary key batch and only rewrites rows whose flag changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50000)
+
+    def handle(self, *args, batch_size, **options):
+        bounds = Review.objects.order_by().aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            self.stdout.write("No reviews to backfill.")
+            return
+
+        purchased = (
+            Exists(OrderItem.objects.delivered_to(OuterRef("user"), OuterRef("product")))
+            | Exists(ArchivedOrderItem.objects.delivered_to(OuterRef("user"), OuterRef("product")))
+        )
+        verified = unverified = 0
+        for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+            batch = Review.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+            with transaction.atomic():
+                verified += batch.filter(purchased, verified_purchase=False).update(verified_purchase=True)
+                unverified += batch.filter(~purchased, verified_purchase=True).update(verified_purchase=False)
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Processed reviews {start}..{start + batch_size - 1}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {verified} review(s) as verified and {unverified} as unverified."
+        ))
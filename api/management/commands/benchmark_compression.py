@@ -0,0 +1,41 @@
+import time
+
+from django.test import Client
+
+from api.catalog import bump_catalog_version
+from api.management.benchmark import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Measure CPU time per /api/products/ request with and without compression, "
+        "for freshly rendered and cached (precompressed) responses."
+    )
+    default_products = 2_000
+
+    def benchmark(self, products, repeat, **options):
+        self.seed_catalog(products)
+        client = Client()
+        url = "/api/products/"
+
+        cases = [
+            ("identity", ""),
+            ("gzip", "gzip"),
+            ("br", "br"),
+        ]
+        self.stdout.write(f"{'case':<28}{'CPU ms/request':>16}{'bytes':>12}")
+        for cached in (False, True):
+            for label, accept in cases:
+                client.get(url, HTTP_ACCEPT_ENCODING=accept)  # warm the entry for the cached case
+                timings = []
+                for _ in range(repeat):
+                    if not cached:
+                        bump_catalog_version()
+                    start = time.process_time()
+                    response = client.get(url, HTTP_ACCEPT_ENCODING=accept)
+                    timings.append((time.process_time() - start) * 1000)
+                encoding = response.get("Content-Encoding", "identity")
+                name = f"{'cached' if cached else 'fresh'} / {label}"
+                if encoding != label:
+                    name += f" (got {encoding})"
+                self.stdout.write(f"{name:<28}{min(timings):>16.2f}{len(response.content):>12,}")
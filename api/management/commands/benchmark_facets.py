@@ -0,0 +1,39 @@
+from django.db.models import Avg
+from django.http import QueryDict
+
+from api.facets import PRICE_RANGES, RATING_FLOORS, SIZES, ProductFacets, _price_bucket_q
+from api.management.benchmark import BenchmarkCommand
+from api.models import Product
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Benchmark product facet counts: the single aggregate query used by "
+        "/api/products/?facets=true against one COUNT per facet value."
+    )
+
+    def benchmark(self, products, repeat, **options):
+        self.seed_catalog(products)
+        base = Product.objects.all()
+
+        for params in ["", "size=M&min_rating=3", "min_price=500&max_price=2000&featured=true"]:
+            facets = ProductFacets(QueryDict(params))
+            self.stdout.write(f"\nfilters: {params or '(none)'}")
+            self.timeit("single aggregate query", lambda: facets.counts(base), repeat)
+            self.timeit("one COUNT per facet value", lambda: self.count_per_value(facets, base), repeat)
+
+    @staticmethod
+    def count_per_value(facets, base):
+        """The naive sidebar: filter, then issue one COUNT for each facet value."""
+        filtered = facets.filter(base)
+        counts = {"price": {}, "size": {}, "rating": {}}
+        for key, low, high in PRICE_RANGES:
+            counts["price"][key] = filtered.filter(_price_bucket_q(low, high)).count()
+        for code in SIZES:
+            counts["size"][code] = filtered.filter(sizes__size=code).count()
+        rated = filtered.annotate(avg_rating=Avg("reviews__rating"))
+        for floor in RATING_FLOORS:
+            counts["rating"][str(floor)] = rated.filter(avg_rating__gte=floor).count()
+        counts["featured"] = filtered.filter(is_featured=True).count()
+        counts["total"] = filtered.count()
+        return counts
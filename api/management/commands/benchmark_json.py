@@ -0,0 +1,41 @@
+from io import BytesIO
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.management.benchmark import BenchmarkCommand
+from api.models import Product
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import ProductSerializer
+
+
+class Command(BenchmarkCommand):
+    help = "Benchmark rendering/parsing ProductSerializer output with DRF's stdlib JSON and the orjson path."
+    default_products = 10_000
+
+    def benchmark(self, products, repeat, **options):
+        self.seed_catalog(products)
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: both paths use the stdlib encoder."))
+
+        queryset = Product.objects.select_related("category").prefetch_related("reviews")
+        timings = self.timeit("ProductSerializer(many=True).data", lambda: ProductSerializer(queryset, many=True).data, 1)
+        data = ProductSerializer(queryset, many=True).data
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        payload = stdlib.render(data)
+        if fast.render(data) != payload:
+            self.stderr.write(self.style.ERROR("Rendered output differs between the two paths!"))
+        self.stdout.write(f"payload: {len(payload) / 1024:.0f} KiB")
+
+        render_stdlib = self.timeit("render: stdlib json", lambda: stdlib.render(data), repeat)
+        render_fast = self.timeit("render: FastJSONRenderer", lambda: fast.render(data), repeat)
+        parse_stdlib = self.timeit("parse: stdlib json", lambda: JSONParser().parse(BytesIO(payload)), repeat)
+        parse_fast = self.timeit("parse: FastJSONParser", lambda: FastJSONParser().parse(BytesIO(payload)), repeat)
+
+        self.stdout.write(
+            f"\nrender speedup x{min(render_stdlib) / min(render_fast):.1f}, "
+            f"parse speedup x{min(parse_stdlib) / min(parse_fast):.1f} "
+            f"(serializer itself: {min(timings):.0f} ms)"
+        )
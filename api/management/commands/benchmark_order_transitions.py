@@ -0,0 +1,60 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from api.audit import audit_batch
+from api.management.benchmark import BenchmarkCommand
+from api.models import Order, OrderItem, Product
+from api.order_transitions import transition_orders
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = "Benchmark bulk order status transitions against saving the orders one by one."
+    default_products = 2000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--orders", type=int, default=5000)
+
+    def benchmark(self, products, repeat, orders, **options):
+        self.seed_catalog(products, max_reviews=0)
+        product_ids = list(Product.objects.values_list("id", flat=True))
+        user = User.objects.first()
+
+        def seed_orders():
+            with transaction.atomic():
+                created = Order.objects.bulk_create(
+                    [Order(user=user, status="processing", stock_reserved=True) for _ in range(orders)]
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product_id=product_id, quantity=random.randint(1, 3), price=10)
+                    for order in created
+                    for product_id in random.sample(product_ids, 3)
+                ])
+            return [order.id for order in created]
+
+        def timed(label, func):
+            # One audit batch, as a request would have, written inside the timing.
+            start = time.perf_counter()
+            with audit_batch(source="benchmark"), transaction.atomic():
+                func()
+            self.stdout.write(f"{label:<44} {time.perf_counter() - start:10.2f} s")
+
+        for _ in range(max(repeat, 1)):
+            ids = seed_orders()
+            timed(f"bulk: ship {orders} orders", lambda: transition_orders(ids, "shipped"))
+            ids = seed_orders()
+            timed(f"bulk: cancel {orders} orders (restock)", lambda: transition_orders(ids, "canceled"))
+
+            ids = seed_orders()
+
+            def one_by_one():
+                for order in Order.objects.filter(pk__in=ids):
+                    order.status = "shipped"
+                    order.save()
+
+            timed(f"row by row: ship {orders} orders", one_by_one)
@@ -0,0 +1,94 @@
+import random
+import time
+from decimal import Decimal
+
+from api.management.benchmark import BenchmarkCommand
+from api.models import Category, Product, Promotion
+from api.promotions import CartLine, CompiledPromotions, InvalidCoupon
+
+KINDS = ["percent", "percent", "fixed", "bxgy"]
+
+
+class Command(BenchmarkCommand):
+    help = "Benchmark pricing carts against many active promotions, compiled versus rule-by-rule."
+    default_products = 20_000
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--rules", type=int, default=1000)
+        parser.add_argument("--cart-size", type=int, default=50)
+        parser.add_argument("--carts", type=int, default=200)
+
+    def benchmark(self, products, repeat, rules, cart_size, carts, **options):
+        self.seed_catalog(products, categories=40, max_reviews=0)
+        product_rows = list(Product.objects.values_list("id", "category_id", "price"))
+        category_ids = list(Category.objects.values_list("id", flat=True))
+
+        promotions = []
+        for i in range(rules):
+            kind = random.choice(KINDS)
+            scope = random.random()
+            promotions.append(Promotion(
+                name=f"Promotion {i}",
+                code=f"CODE{i}" if i % 10 == 0 else None,
+                kind=kind,
+                value=Decimal(random.choice([50, 100, 250])) if kind == "fixed" else Decimal(random.randint(5, 50)),
+                product_id=random.choice(product_rows)[0] if scope < 0.7 else None,
+                category_id=random.choice(category_ids) if 0.7 <= scope < 0.98 else None,
+                buy_quantity=2 if kind == "bxgy" else 0,
+                get_quantity=1 if kind == "bxgy" else 0,
+                min_subtotal=Decimal(random.choice([0, 0, 500])),
+                priority=random.randint(0, 10),
+            ))
+        Promotion.objects.bulk_create(promotions)
+
+        start = time.perf_counter()
+        compiled = CompiledPromotions.from_database()
+        self.stdout.write(f"compile {len(compiled)} rules: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Carts lean on promoted products so most of them actually hit rules.
+        promoted = [row for row in product_rows if row[0] in compiled.by_product]
+        cart_lines = [
+            [
+                CartLine(n, pk, category_id, price, random.randint(1, 4))
+                for n, (pk, category_id, price) in enumerate(
+                    random.sample(promoted, cart_size // 2) + random.sample(product_rows, cart_size - cart_size // 2)
+                )
+            ]
+            for _ in range(carts)
+        ]
+        coupons = [random.choice([None, *compiled.coupons]) for _ in range(carts)]
+        rules_list = (
+            [rule for rules in compiled.by_product.values() for rule in rules]
+            + [rule for rules in compiled.by_category.values() for rule in rules]
+            + compiled.sitewide
+        )
+        rules_list.sort(key=lambda rule: (-rule.priority, rule.id))
+
+        def compiled_run():
+            for lines, coupon in zip(cart_lines, coupons):
+                try:
+                    compiled.apply(lines, coupon)
+                except InvalidCoupon:
+                    pass
+
+        def naive_run():
+            # Every rule checked against every line, as a per-rule loop would.
+            for lines, coupon in zip(cart_lines, coupons):
+                claimed = set()
+                remaining = {line.key: line.unit_price * line.quantity for line in lines}
+                for rule in rules_list:
+                    rule_lines = [line for line in lines if line.key not in claimed and rule.matches(line)]
+                    if rule_lines and rule.discounts(rule_lines, remaining):
+                        claimed.update(line.key for line in rule_lines)
+                if coupon:
+                    rule = compiled.coupons[coupon]
+                    rule.discounts([line for line in lines if rule.matches(line)], remaining)
+
+        label = f"{carts} carts x {cart_size} lines"
+        compiled_timings = self.timeit(f"compiled: {label}", compiled_run, repeat)
+        naive_timings = self.timeit(f"rule-by-rule: {label}", naive_run, repeat)
+        self.stdout.write(
+            f"per cart: compiled {min(compiled_timings) / carts * 1000:.0f} us, "
+            f"rule-by-rule {min(naive_timings) / carts * 1000:.0f} us"
+        )
@@ -0,0 +1,36 @@
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import CompiledProductSerializer
+from api.management.benchmark import BenchmarkCommand
+from api.models import Product
+from api.serializers import ProductSerializer
+
+
+class Command(BenchmarkCommand):
+    help = "Benchmark ProductSerializer(many=True) against the compiled read-only list serializer."
+    default_products = 10_000
+
+    def benchmark(self, products, repeat, **options):
+        self.seed_catalog(products)
+        context = {"request": Request(APIRequestFactory().get("/api/products/"))}
+        queryset = Product.objects.select_related("category").prefetch_related("reviews")
+
+        drf = self.timeit(
+            "ProductSerializer(many=True)",
+            lambda: ProductSerializer(queryset, many=True, context=context).data,
+            repeat,
+        )
+        compiled = self.timeit(
+            "CompiledProductSerializer",
+            lambda: CompiledProductSerializer(context).to_representation(queryset),
+            repeat,
+        )
+        if CompiledProductSerializer(context).to_representation(queryset) != ProductSerializer(
+            queryset, many=True, context=context
+        ).data:
+            self.stderr.write(self.style.ERROR("Compiled output differs from ProductSerializer!"))
+        self.stdout.write(
+            f"\n{products / (min(drf) / 1000):,.0f} vs {products / (min(compiled) / 1000):,.0f} products/s "
+            f"(x{min(drf) / min(compiled):.1f}), queries included"
+        )
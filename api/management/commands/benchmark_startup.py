@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory_kib(pid):
+    """(RSS, PSS) in KiB; PSS splits shared copy-on-write pages between the processes using them."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with and without preload_app (gunicorn.conf.py) and report "
+        "time until every worker is up and total RSS/PSS of master + workers. Linux only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--timeout", type=float, default=60)
+
+    def handle(self, *args, workers, port, timeout, **options):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            raise CommandError("benchmark_startup needs Linux /proc.")
+        self.stdout.write(f"{'mode':<12}{'ready s':>10}{'RSS MiB':>12}{'PSS MiB':>12}")
+        for preload in (False, True):
+            ready, rss, pss = self.measure(preload, workers, port, timeout)
+            mode = "preload" if preload else "no preload"
+            self.stdout.write(f"{mode:<12}{ready:>10.2f}{rss / 1024:>12.1f}{pss / 1024:>12.1f}")
+
+    def measure(self, preload, workers, port, timeout):
+        env = dict(
+            os.environ,
+            GUNICORN_PRELOAD=str(preload),
+            WEB_CONCURRENCY=str(workers),
+            PORT=str(port),
+        )
+        command = [sys.executable, "-m", "gunicorn", "urbanfashion.wsgi", "--config", "gunicorn.conf.py"]
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise CommandError("gunicorn did not become ready in time.")
+                if process.poll() is not None:
+                    raise CommandError("gunicorn exited during startup.")
+                if len(_children(process.pid)) >= workers and self.responds(port):
+                    break
+                time.sleep(0.05)
+            ready = time.perf_counter() - start
+            # Every worker answers at least once so lazily-built state is included.
+            for _ in range(workers * 4):
+                self.responds(port)
+            pids = [process.pid, *_children(process.pid)]
+            rss = pss = 0
+            for pid in pids:
+                pid_rss, pid_pss = _memory_kib(pid)
+                rss += pid_rss
+                pss += pid_pss
+            return ready, rss, pss
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    @staticmethod
+    def responds(port):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/", timeout=1)
+        except urllib.error.HTTPError:
+            return True  # any HTTP answer means a worker is serving
+        except OSError:
+            return False
+        return True
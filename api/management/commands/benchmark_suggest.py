@@ -0,0 +1,46 @@
+import random
+import statistics
+import time
+
+from api.management.benchmark import BenchmarkCommand
+from api.models import Product
+from api.suggest import SuggestionIndex
+
+ADJECTIVES = ["Classic", "Slim", "Relaxed", "Vintage", "Oversized", "Cropped", "Linen", "Cotton", "Denim", "Wool"]
+COLOURS = ["Black", "White", "Navy", "Olive", "Beige", "Red", "Grey", "Mustard", "Sky", "Charcoal"]
+GARMENTS = ["Shirt", "Tee", "Jacket", "Hoodie", "Chinos", "Jeans", "Shorts", "Sweater", "Blazer", "Kurta"]
+QUERIES = ["s", "sh", "shi", "slim n", "den", "char", "oversized b", "kurta", "zzz"]
+
+
+class Command(BenchmarkCommand):
+    help = "Benchmark building the product suggestion index and serving typeahead lookups from it."
+    default_products = 500_000
+
+    def benchmark(self, products, repeat, **options):
+        self.seed_catalog(products, max_reviews=1)
+        batch = []
+        for product in Product.objects.only("id").iterator(chunk_size=5000):
+            product.title = f"{random.choice(ADJECTIVES)} {random.choice(COLOURS)} {random.choice(GARMENTS)} {product.id}"
+            batch.append(product)
+            if len(batch) == 5000:
+                Product.objects.bulk_update(batch, ["title"])
+                batch = []
+        Product.objects.bulk_update(batch, ["title"])
+
+        start = time.perf_counter()
+        index = SuggestionIndex.from_database()
+        self.stdout.write(
+            f"build: {time.perf_counter() - start:.2f} s, {len(index.texts)} suggestions, "
+            f"{index.count} entries, {index.nbytes() / 2**20:.1f} MiB"
+        )
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(max(repeat, 1) * 200):
+                start = time.perf_counter()
+                found = index.suggest(query, limit=8)
+                timings.append((time.perf_counter() - start) * 1_000_000)
+            self.stdout.write(
+                f"suggest({query!r:<14}) best {min(timings):8.1f} us   median {statistics.median(timings):8.1f} us"
+                f"   -> {found[0]['text'] if found else '-'}"
+            )
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.feeds import build_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the gzip product feeds and sitemaps served from FEED_URL. Does nothing while "
+        "they match the current catalog version, so it can run as often as the scheduler likes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the catalog is unchanged.")
+        parser.add_argument("--root", default=None, help=f"Output directory (default: FEED_ROOT, {settings.FEED_ROOT}).")
+
+    def handle(self, *args, force=False, root=None, **options):
+        manifest = build_feeds(root=root, force=force)
+        if manifest is None:
+            self.stdout.write("Feeds are up to date.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(manifest['files'])} files for {manifest['products']} products and "
+            f"{manifest['categories']} categories (catalog version {manifest['version']})."
+        ))
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models import InventorySnapshot, Product, RestockAlert
+
+
+class Command(BaseCommand):
+    help = (
+        "Record an inventory snapshot and send one batched restock alert for products "
+        "that crossed their low stock threshold since the previous snapshot. "
+        "Meant to be run periodically (e.g. from the scheduler)."
+    )
+
+    def handle(self, *args, **options):
+        totals = Product.objects.order_by().aggregate(
+            product_count=Count("id"),
+            total_units=Coalesce(Sum("stock_quantity"), 0),
+            out_of_stock_count=Count("id", filter=Q(stock_quantity__lte=0)),
+            low_stock_count=Count(
+                "id", filter=Q(stock_quantity__gt=0, stock_quantity__lte=F("low_stock_threshold"))
+            ),
+        )
+        # Served from the partial product_needs_restock_idx index.
+        restock_ids = sorted(Product.objects.needs_restock().order_by().values_list("id", flat=True))
+
+        previous = InventorySnapshot.objects.first()
+        already_below = set(previous.restock_product_ids) if previous else set()
+        crossed = [pk for pk in restock_ids if pk not in already_below]
+
+        with transaction.atomic():
+            snapshot = InventorySnapshot.objects.create(restock_product_ids=restock_ids, **totals)
+            alert = RestockAlert.objects.create(snapshot=snapshot, product_ids=crossed) if crossed else None
+
+        self.stdout.write(
+            f"Snapshot #{snapshot.id}: {snapshot.product_count} products, {snapshot.total_units} units, "
+            f"{snapshot.low_stock_count} low stock, {snapshot.out_of_stock_count} out of stock"
+        )
+        if alert is None:
+            self.stdout.write("No new threshold crossings.")
+            return
+
+        self.send_alert(alert)
+        self.stdout.write(self.style.WARNING(f"Restock alert #{alert.id} queued for {len(crossed)} product(s)."))
+
+    def send_alert(self, alert):
+        products = Product.objects.filter(id__in=alert.product_ids).order_by("stock_quantity", "id")
+        lines = [
+            f"- {title} (stock {stock}, threshold {threshold})"
+            for title, stock, threshold in products.values_list("title", "stock_quantity", "low_stock_threshold")
+        ]
+        send_mail(
+            f"Restock alert: {len(lines)} product(s) at or below threshold",
+            "The following products crossed their low stock threshold:\n\n" + "\n".join(lines),
+            settings.DEFAULT_FROM_EMAIL,
+            [settings.DEFAULT_FROM_EMAIL],
+            fail_silently=True,
+        )
+        alert.sent_at = timezone.now()
+        alert.save(update_fields=["sent_at"])
@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import run_load_test
+from api.management.benchmark import seed_catalog
+from api.models import Category, Product
+
+QUERIES = ["pro", "product 1", "cat", "category 2", "p"]
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end load test: browse, cart, checkout and payment verification by concurrent "
+        "virtual users against a local gunicorn (or --url), with Razorpay, email and media "
+        "replaced by local stand-ins. Run with --settings=urbanfashion.settings_loadtest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users.")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds of full load after ramp-up.")
+        parser.add_argument(
+            "--iterations", type=int, help="Run this many iterations per user instead of for --duration seconds.",
+        )
+        parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start.")
+        parser.add_argument("--checkout-ratio", type=float, default=0.5, help="Share of iterations that check out.")
+        parser.add_argument("--think-time", type=float, default=0, help="Mean pause between steps, in seconds.")
+        parser.add_argument("--products", type=int, default=2000, help="Catalog size to seed into an empty database.")
+        parser.add_argument(
+            "--stock", type=int, default=100_000, help="Top every product up to this stock so checkouts don't run out.",
+        )
+        parser.add_argument("--url", help="Target an already running server instead of starting gunicorn.")
+        parser.add_argument("--port", type=int, default=8766)
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes.")
+        parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report here (default: print it).")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "LOADTEST", False):
+            raise CommandError(
+                "loadtest seeds data and needs the local stand-ins; "
+                "run it with --settings=urbanfashion.settings_loadtest."
+            )
+        settings.LOADTEST_ROOT.mkdir(parents=True, exist_ok=True)
+        call_command("migrate", verbosity=0, interactive=False)
+        random.seed(options["seed"])
+        if not Product.objects.exists():
+            start = time.perf_counter()
+            seed_catalog(options["products"], users=20, max_reviews=2)
+            self.stderr.write(f"Seeded {options['products']} products in {time.perf_counter() - start:.1f} s")
+        Product.objects.filter(stock_quantity__lt=options["stock"]).update(stock_quantity=options["stock"])
+        catalog = {
+            "products": list(Product.objects.values_list("id", flat=True)),
+            "categories": list(Category.objects.values_list("slug", flat=True)),
+            "queries": QUERIES,
+            "razorpay_secret": settings.RAZORPAY_KEY_SECRET,
+        }
+
+        server = None
+        base_url = options["url"]
+        if base_url is None:
+            base_url = f"http://127.0.0.1:{options['port']}"
+            server = self.start_server(options)
+        try:
+            length = (
+                f"{options['duration']:g} s" if options["iterations"] is None else f"{options['iterations']} iterations each"
+            )
+            self.stderr.write(f"{options['users']} users, {options['ramp_up']:g} s ramp-up + {length} against {base_url}")
+            report = run_load_test(
+                base_url,
+                catalog,
+                users=options["users"],
+                duration=options["duration"],
+                ramp_up=options["ramp_up"],
+                checkout_ratio=options["checkout_ratio"],
+                think_time=options["think_time"],
+                seed=options["seed"],
+                iterations_per_user=options["iterations"],
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+        self.print_summary(report)
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def start_server(self, options):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "urbanfashion.settings_loadtest"),
+            PORT=str(options["port"]),
+            WEB_CONCURRENCY=str(options["workers"]),
+            GUNICORN_THREADS=str(options["threads"]),
+            GUNICORN_MAX_REQUESTS="0",
+        )
+        command = [sys.executable, "-m", "gunicorn", "urbanfashion.wsgi", "--config", "gunicorn.conf.py"]
+        log = open(settings.LOADTEST_ROOT / "server.log", "w")
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"gunicorn exited during startup; see {settings.LOADTEST_ROOT / 'server.log'}.")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{options['port']}/readyz", timeout=1)
+                return process
+            except (OSError, urllib.error.HTTPError):
+                time.sleep(0.1)
+        process.terminate()
+        raise CommandError("gunicorn did not become ready in time.")
+
+    def print_summary(self, report):
+        total = report["total"]
+        self.stderr.write(
+            f"\n{total['requests']} requests in {report['duration_s']:.1f} s: {total['throughput_rps']:.1f} req/s, "
+            f"{total['error_rate']:.2%} errors; iterations {report['iterations']}"
+        )
+        self.stderr.write(f"{'endpoint':<18}{'reqs':>7}{'req/s':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+        for name, stats in report["endpoints"].items():
+            latency = stats["latency_ms"]
+            self.stderr.write(
+                f"{name:<18}{stats['requests']:>7}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.2%}"
+                f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}{latency['max']:>9.1f}"
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.startup import profile_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile imports of a cold start (django.setup() and the URLconf) with -X importtime "
+        "and report the slowest packages and modules."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Rows per table.")
+        parser.add_argument("--no-urls", action="store_true", help="Profile django.setup() only.")
+
+    def handle(self, *args, limit, no_urls, **options):
+        profile = profile_startup(urls=not no_urls)
+        self.stdout.write(
+            f"startup {profile.seconds * 1000:.0f} ms wall, {profile.import_seconds * 1000:.0f} ms importing "
+            f"{len(profile.imports)} modules\n"
+        )
+
+        self.stdout.write(f"{'package':<44}{'self ms':>10}")
+        for package, self_us in profile.by_package()[:limit]:
+            self.stdout.write(f"{package:<44}{self_us / 1000:>10.1f}")
+
+        self.stdout.write(f"\n{'module':<44}{'self ms':>10}{'cumulative ms':>15}")
+        slowest = sorted(profile.imports, key=lambda row: row.cumulative_us, reverse=True)
+        for row in slowest[:limit]:
+            self.stdout.write(f"{row.module:<44}{row.self_us / 1000:>10.1f}{row.cumulative_us / 1000:>15.1f}")
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.order_transitions import expired_reservations, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancel pending, unpaid orders older than ORDER_RESERVATION_MINUTES and put their "
+        "stock back. Run it from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many orders would be canceled.")
+
+    def handle(self, *args, dry_run, **options):
+        if dry_run:
+            self.stdout.write(f"{expired_reservations().count()} expired reservation(s) would be released.")
+            return
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {len(released)} order(s) unpaid after {settings.ORDER_RESERVATION_MINUTES} minutes."
+        ))
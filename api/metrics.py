@@ -0,0 +1,108 @@
+"""
+In-process request, database and cache metrics, exported in the Prometheus
+text format at ``/metrics``.
+
+Counters are per process: each gunicorn worker reports what it has served
+since it started. Every update takes one short lock, so recording is safe
+from gthread workers.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+# Upper bounds (seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "buckets", "latency_sum", "count", "db_queries")
+
+    def __init__(self):
+        self.statuses = defaultdict(int)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+        self.latency_sum = 0.0
+        self.count = 0
+        self.db_queries = 0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = Lock()
+        self._routes = defaultdict(_RouteStats)  # (route, method) -> stats
+        self._cache = defaultdict(lambda: [0, 0])  # cache name -> [hits, misses]
+
+    def observe_request(self, route, method, status, seconds, db_queries):
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._routes[route, method]
+            stats.statuses[status] += 1
+            stats.buckets[bucket] += 1
+            stats.latency_sum += seconds
+            stats.count += 1
+            stats.db_queries += db_queries
+
+    def cache_lookup(self, name, hit):
+        with self._lock:
+            self._cache[name][0 if hit else 1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._cache.clear()
+
+    def render(self):
+        with self._lock:
+            routes = [
+                (route, method, dict(s.statuses), list(s.buckets), s.latency_sum, s.count, s.db_queries)
+                for (route, method), s in sorted(self._routes.items())
+            ]
+            caches = sorted((name, hits, misses) for name, (hits, misses) in self._cache.items())
+
+        lines = [
+            "# HELP http_requests_total Requests served, by route name, method and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for route, method, statuses, *_ in routes:
+            for code, count in sorted(statuses.items()):
+                lines.append(f"http_requests_total{_labels(route=route, method=method, status=code)} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Time spent in Django per request, by route name and method.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for route, method, _, buckets, latency_sum, count, _ in routes:
+            cumulative = 0
+            for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), buckets):
+                cumulative += n
+                labels = _labels(route=route, method=method, le=bound)
+                lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+            labels = _labels(route=route, method=method)
+            lines.append(f"http_request_duration_seconds_sum{labels} {latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{labels} {count}")
+
+        lines += [
+            "# HELP http_request_db_queries_total Database queries executed while serving requests, by route name.",
+            "# TYPE http_request_db_queries_total counter",
+        ]
+        for route, method, *_, db_queries in routes:
+            lines.append(f"http_request_db_queries_total{_labels(route=route, method=method)} {db_queries}")
+
+        lines += [
+            "# HELP cache_lookups_total Application cache lookups, by cache and result.",
+            "# TYPE cache_lookups_total counter",
+        ]
+        for name, hits, misses in caches:
+            lines.append(f"cache_lookups_total{_labels(cache=name, result='hit')} {hits}")
+            lines.append(f"cache_lookups_total{_labels(cache=name, result='miss')} {misses}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
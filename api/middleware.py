@@ -0,0 +1,79 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .compression import compress, negotiate
+from .metrics import metrics
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli compression for JSON API responses at or above
+    ``API_COMPRESSION_MIN_SIZE`` bytes.
+
+    Responses served from the catalog response cache carry their cache entry,
+    whose compressed variants are produced once and stored alongside it, so
+    cached catalog pages are not recompressed on every request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+            or len(response.content) < getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        entry = getattr(response, 'cache_entry', None)
+        body = entry.variant(encoding) if entry is not None else compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class MetricsMiddleware:
+    """Record count, latency and database queries per route name (see ``api.metrics``)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, elapsed, queries)
+        return response
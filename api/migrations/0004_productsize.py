@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_inventory_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSize',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('S', 'S'), ('M', 'M'), ('L', 'L'), ('XL', 'XL')], max_length=3)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sizes', to='api.product')),
+            ],
+            options={
+                'unique_together': {('product', 'size')},
+            },
+        ),
+    ]
@@ -1,8 +1,21 @@
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+class AuditedFieldsMixin:
+    """Remembers ``AUDIT_FIELDS`` as loaded from the database, so saves can log what changed (see api/audit.py)."""
+    AUDIT_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_loaded = {name: instance.__dict__[name] for name in cls.AUDIT_FIELDS if name in instance.__dict__}
+        return instance
+
 class Category(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=60, unique=True)
@@ -14,7 +27,17 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class ProductQuerySet(models.QuerySet):
+    def needs_restock(self):
+        """Products at or below their low stock threshold (out of stock included)."""
+        return self.filter(stock_quantity__lte=F("low_stock_threshold"))
+
+    def low_stock(self):
+        """Queryset equivalent of ``Product.is_low_stock``."""
+        return self.needs_restock().filter(stock_quantity__gt=0)
+
+class Product(AuditedFieldsMixin, models.Model):
+    AUDIT_FIELDS = ("stock_quantity",)
     title = models.CharField(max_length=120)
     slug = models.SlugField(max_length=130, unique=True)
     category = models.ForeignKey(Category, related_name="products", on_delete=models.CASCADE)
@@ -26,8 +49,19 @@ class Product(models.Model):
     stock_quantity = models.IntegerField(default=0)
     low_stock_threshold = models.IntegerField(default=5)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["-id"]
+        indexes = [
+            # Partial index: only rows that need restocking are indexed, so the
+            # low stock listing and inventory snapshots never scan the catalog.
+            models.Index(
+                fields=["stock_quantity"],
+                name="product_needs_restock_idx",
+                condition=Q(stock_quantity__lte=F("low_stock_threshold")),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -40,7 +74,25 @@ class Product(models.Model):
     def is_low_stock(self):
         return 0 < self.stock_quantity <= self.low_stock_threshold
 
-class Order(models.Model):
+class ProductSize(models.Model):
+    """A size a product is offered in. Used by the size facet on the product list."""
+    SIZE_CHOICES = [
+        ("S", "S"),
+        ("M", "M"),
+        ("L", "L"),
+        ("XL", "XL"),
+    ]
+    product = models.ForeignKey(Product, related_name="sizes", on_delete=models.CASCADE)
+    size = models.CharField(max_length=3, choices=SIZE_CHOICES)
+
+    class Meta:
+        unique_together = ("product", "size")
+
+    def __str__(self):
+        return f"{self.product.title} ({self.size})"
+
+class Order(AuditedFieldsMixin, models.Model):
+    AUDIT_FIELDS = ("status", "payment_verified")
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("processing", "Processing"),
@@ -63,13 +115,37 @@ class Order(models.Model):
     payment_method = models.CharField(max_length=20, default="UPI")
     payment_screenshot = models.ImageField(upload_to="payment_proofs/", blank=True, null=True)
     payment_verified = models.BooleanField(default=False)
+    # Promotions applied at checkout (total_amount is after discount)
+    coupon_code = models.CharField(max_length=30, blank=True)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Set when checkout took the items out of stock; canceling puts them back.
+    stock_reserved = models.BooleanField(default=False)
+
+    # Statuses an order never leaves; archive_orders moves old ones to ArchivedOrder.
+    FINAL_STATUSES = ("delivered", "canceled")
+    # Status changes staff may make in bulk (see api/order_transitions.py)
+    TRANSITIONS = {
+        "pending": ("processing", "canceled"),
+        "processing": ("shipped", "canceled"),
+        "shipped": ("delivered",),
+        "delivered": (),
+        "canceled": (),
+    }
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Lets archive_orders find old finished orders without scanning the table.
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.email}"
 
+    @classmethod
+    def statuses_leading_to(cls, status):
+        return [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+
 
 # CartItem model – represents a product added to a user's cart
 class CartItem(models.Model):
@@ -91,6 +167,11 @@ class CartItem(models.Model):
 
     def __str__(self):
         return f"{self.product.title} ({self.size}) x {self.quantity} for {self.user.email}"
+class OrderItemQuerySet(models.QuerySet):
+    def delivered_to(self, user, product):
+        """Items of ``product`` in ``user``'s delivered orders (accepts OuterRef for subqueries)."""
+        return self.filter(order__user=user, order__status="delivered", product=product)
+
 class OrderItem(models.Model):
     SIZE_CHOICES = [
         ("S", "S"),
@@ -104,6 +185,8 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=8, decimal_places=2)
 
+    objects = OrderItemQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.title} ({self.size}) x {self.quantity}"
 
@@ -130,7 +213,8 @@ class ContactMessage(models.Model):
     def __str__(self):
         return f"Message from {self.name} - {self.email}"
 
-class Review(models.Model):
+class Review(AuditedFieldsMixin, models.Model):
+    AUDIT_FIELDS = ("rating", "comment")
     product = models.ForeignKey(Product, related_name="reviews", on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name="reviews", on_delete=models.CASCADE)
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])  # 1-5 stars
@@ -157,3 +241,157 @@ class Wishlist(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.product.title}"
 
+
+class InventorySnapshot(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    product_count = models.IntegerField(default=0)
+    total_units = models.IntegerField(default=0)
+    low_stock_count = models.IntegerField(default=0)
+    out_of_stock_count = models.IntegerField(default=0)
+    # Ids of products at or below their threshold when the snapshot was taken.
+    # The next snapshot diffs against this to detect threshold crossings.
+    restock_product_ids = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Inventory snapshot {self.created_at:%Y-%m-%d %H:%M}"
+
+class RestockAlert(models.Model):
+    snapshot = models.ForeignKey(InventorySnapshot, related_name="alerts", on_delete=models.CASCADE)
+    product_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Restock alert for {len(self.product_ids)} product(s)"
+
+
+class ArchivedOrder(models.Model):
+    """
+    A delivered or canceled order moved out of ``Order`` by ``archive_orders``.
+    Keeps the original order id; read-only from then on.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, related_name="archived_orders", on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField(db_index=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    shipping_name = models.CharField(max_length=100, blank=True)
+    shipping_phone = models.CharField(max_length=20, blank=True)
+    shipping_address = models.TextField(blank=True)
+    shipping_city = models.CharField(max_length=50, blank=True)
+    shipping_state = models.CharField(max_length=50, blank=True)
+    shipping_pincode = models.CharField(max_length=10, blank=True)
+    payment_method = models.CharField(max_length=20, default="UPI")
+    payment_screenshot = models.ImageField(upload_to="payment_proofs/", blank=True, null=True)
+    payment_verified = models.BooleanField(default=False)
+    coupon_code = models.CharField(max_length=30, blank=True)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.user.email}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name="items", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="archived_order_items", on_delete=models.CASCADE)
+    size = models.CharField(max_length=3, choices=OrderItem.SIZE_CHOICES)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    objects = OrderItemQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.product.title} ({self.size}) x {self.quantity}"
+
+
+class PromotionQuerySet(models.QuerySet):
+    def live(self, now):
+        """Enabled promotions whose window contains ``now``."""
+        return self.filter(
+            Q(starts_at__isnull=True) | Q(starts_at__lte=now),
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+            is_active=True,
+        )
+
+class Promotion(models.Model):
+    """
+    A sale (no code, applied automatically) or a coupon (applied with its code).
+    Scoped to one product, one category, or the whole cart when neither is set.
+    """
+    KIND_CHOICES = [
+        ("percent", "Percentage off"),
+        ("fixed", "Fixed amount off"),
+        ("bxgy", "Buy X get Y"),
+    ]
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=30, unique=True, null=True, blank=True, help_text="Blank for an automatic sale.")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Percent off (percent, and for bxgy the discount on the "get" items: 100 = free) or amount off (fixed)
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    product = models.ForeignKey(Product, related_name="promotions", on_delete=models.CASCADE, null=True, blank=True)
+    category = models.ForeignKey(Category, related_name="promotions", on_delete=models.CASCADE, null=True, blank=True)
+    buy_quantity = models.PositiveIntegerField(default=0)
+    get_quantity = models.PositiveIntegerField(default=0)
+    min_subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Higher first; a cart line gets at most one automatic sale.
+    priority = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(blank=True, null=True)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PromotionQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-priority", "id"]
+
+    def clean(self):
+        if self.product_id and self.category_id:
+            raise ValidationError("Scope a promotion to a product or a category, not both.")
+        if self.kind in ("percent", "bxgy") and not 0 < self.value <= 100:
+            raise ValidationError({"value": "Enter a percentage between 0 and 100."})
+        if self.kind == "bxgy" and not (self.buy_quantity and self.get_quantity):
+            raise ValidationError("Buy X get Y needs both quantities.")
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper() or None if self.code else None
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+class AuditEvent(models.Model):
+    """Append-only record of a change to an order, a product's stock or a review."""
+    ACTION_CHOICES = [
+        ("create", "Create"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    ]
+    entity_type = models.CharField(max_length=30)  # model name: order, product, review
+    entity_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # {field: [old, new]}
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    actor = models.ForeignKey(User, related_name="audit_events", on_delete=models.SET_NULL, null=True, blank=True)
+    # "<METHOD> <path>" of the request that made the change; blank outside requests
+    source = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["entity_type", "entity_id", "created_at"], name="audit_entity_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type} #{self.entity_id} {self.action}"
@@ -0,0 +1,101 @@
+"""
+Order status pub-sub for the order tracking event stream.
+
+Publishing (after commit, see ``api.signals``) stores the order's latest
+status in the cache. Each event loop runs one ``OrderStatusHub``. The hub
+polls the cache with a single ``get_many`` for every order streamed from
+that loop and fans changes out to its subscribers. Open tracking pages
+therefore cost one cache round trip per poll interval per process, and no
+database queries after the stream starts.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUS_TIMEOUT = 60 * 60 * 24
+
+
+def order_status_key(order_id):
+    return f"order:status:{order_id}"
+
+
+def publish_order_status(order_id, status, payment_verified):
+    cache.set(
+        order_status_key(order_id),
+        {"status": status, "payment_verified": payment_verified, "published_at": time.time()},
+        ORDER_STATUS_TIMEOUT,
+    )
+
+
+def publish_order_statuses(statuses):
+    """Publish many orders at once: ``{order_id: (status, payment_verified)}``, one cache round trip."""
+    now = time.time()
+    cache.set_many(
+        {
+            order_status_key(order_id): {"status": status, "payment_verified": payment_verified, "published_at": now}
+            for order_id, (status, payment_verified) in statuses.items()
+        },
+        ORDER_STATUS_TIMEOUT,
+    )
+
+
+class OrderStatusHub:
+    def __init__(self):
+        self.subscribers = defaultdict(set)  # order id -> queues
+        self.latest = {}  # order id -> last published value seen
+        self.task = None
+
+    async def subscribe(self, order_id):
+        """A queue receiving every status published for ``order_id`` from now on."""
+        if order_id not in self.subscribers:
+            # Baseline: whatever is already published is not news to a new subscriber.
+            self.latest[order_id] = await cache.aget(order_status_key(order_id))
+        queue = asyncio.Queue()
+        self.subscribers[order_id].add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._poll())
+        return queue
+
+    def unsubscribe(self, order_id, queue):
+        queues = self.subscribers.get(order_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[order_id]
+                self.latest.pop(order_id, None)
+
+    async def _poll(self):
+        while self.subscribers:
+            await asyncio.sleep(settings.ORDER_STREAM_POLL_INTERVAL)
+            order_ids = list(self.subscribers)
+            try:
+                values = await cache.aget_many([order_status_key(order_id) for order_id in order_ids])
+            except Exception:
+                logger.exception("Polling order statuses failed")
+                continue
+            for order_id in order_ids:
+                value = values.get(order_status_key(order_id))
+                if value is None or value == self.latest.get(order_id) or order_id not in self.subscribers:
+                    continue
+                self.latest[order_id] = value
+                for queue in self.subscribers[order_id]:
+                    queue.put_nowait(value)
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def order_status_hub():
+    """The hub for the running event loop."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = OrderStatusHub()
+    return hub
@@ -0,0 +1,171 @@
+"""
+Set-based order status changes and stock movements.
+
+``transition_orders`` moves any number of orders to a new status with one
+locking SELECT and one ``UPDATE ... WHERE id IN (...) AND status IN (...)``.
+The status list holds the statuses ``Order.TRANSITIONS`` allows into the
+target. Orders in any other status are reported back and left alone.
+Canceling puts the reserved stock back with a single UPDATE over the affected
+products (``adjust_stock``), which checkout also uses to take it out.
+``update_order_status`` sends single-order edits (API, admin) the same way,
+and deleting an order that could still be canceled returns its stock too
+(``api.signals``). Checkout reserves stock for unpaid orders only for
+``ORDER_RESERVATION_MINUTES``: ``release_expired_reservations`` cancels pending,
+unpaid orders past that, from the ``release_reservations`` command and from
+checkout when a product runs short.
+
+A stock movement bumps the catalog version only when it changes a product's
+availability (in stock, low stock), so the stock levels in cached catalog
+payloads can lag behind; ``GET /api/products/stock/`` has the live ones.
+
+``.update()`` skips model signals, so the audit events, tracking-stream
+statuses and catalog version bump that ``api.signals`` produces per save are
+produced here once for the whole set.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import audit
+from .catalog import catalog_changed
+from .models import Order, OrderItem, Product
+from .order_events import publish_order_statuses
+
+TransitionResult = namedtuple("TransitionResult", "status updated skipped missing")
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f"Not enough stock for product(s) {', '.join(map(str, product_ids))}.")
+        self.product_ids = product_ids
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def adjust_stock(deltas):
+    """
+    Add ``deltas[product_id]`` (negative to take out) to each product's stock in one
+    UPDATE. Raises InsufficientStock, changing nothing, if any product would go below zero.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Locked in id order, so concurrent checkouts and cancellations can't deadlock.
+        rows = (
+            Product.objects.select_for_update().filter(pk__in=deltas).order_by("id")
+            .values_list("id", "stock_quantity", "low_stock_threshold")
+        )
+        stock, thresholds = {}, {}
+        for product_id, quantity, threshold in rows:
+            stock[product_id], thresholds[product_id] = quantity, threshold
+        short = [product_id for product_id, quantity in stock.items() if quantity + deltas[product_id] < 0]
+        if short:
+            raise InsufficientStock(short)
+        # One CASE arm per distinct delta, not per product: deltas are small and repeat.
+        by_delta = {}
+        for product_id, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(product_id)
+        Product.objects.filter(pk__in=stock).update(stock_quantity=F("stock_quantity") + Case(
+            *(When(pk__in=product_ids, then=Value(delta)) for delta, product_ids in by_delta.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for product_id, quantity in stock.items():
+            audit.record("product", product_id, "update", {"stock_quantity": [quantity, quantity + deltas[product_id]]})
+        if any(
+            _availability(quantity, thresholds[product_id]) != _availability(quantity + deltas[product_id], thresholds[product_id])
+            for product_id, quantity in stock.items()
+        ):
+            catalog_changed()
+
+
+def _availability(quantity, threshold):
+    # What the cached catalog shows of a stock level (see Product.is_in_stock / is_low_stock).
+    return quantity > 0, 0 < quantity <= threshold
+
+
+def restock(order_ids):
+    """Put the items of ``order_ids`` back in stock."""
+    quantities = (
+        OrderItem.objects.filter(order_id__in=order_ids).order_by()
+        .values("product_id").annotate(quantity=Sum("quantity"))
+        .values_list("product_id", "quantity")
+    )
+    adjust_stock(dict(quantities))
+
+
+def transition_orders(order_ids, status):
+    """Move the orders in ``order_ids`` that may go to ``status`` there; see the module docstring."""
+    if status not in Order.TRANSITIONS:
+        raise ValueError(f"Unknown order status {status!r}")
+    sources = Order.statuses_leading_to(status)
+    order_ids = set(order_ids)
+    with transaction.atomic():
+        rows = list(
+            Order.objects.select_for_update().filter(pk__in=order_ids).order_by("id")
+            .values_list("id", "status", "payment_verified", "stock_reserved")
+        )
+        movable = [row for row in rows if row[1] in sources]
+        updated = [row[0] for row in movable]
+        if updated:
+            changes = {"status": status}
+            if status == "canceled":
+                changes["stock_reserved"] = False
+            Order.objects.filter(pk__in=updated, status__in=sources).update(**changes)
+            if status == "canceled":
+                restock([order_id for order_id, _, _, reserved in movable if reserved])
+            for order_id, previous, _, _ in movable:
+                audit.record("order", order_id, "update", {"status": [previous, status]})
+            published = {order_id: (status, payment_verified) for order_id, _, payment_verified, _ in movable}
+            transaction.on_commit(lambda: publish_order_statuses(published))
+    return TransitionResult(
+        status=status,
+        updated=updated,
+        skipped={order_id: current for order_id, current, _, _ in rows if current not in sources},
+        missing=sorted(order_ids - {row[0] for row in rows}),
+    )
+
+
+def update_order_status(order, status):
+    """
+    Move one order to ``status`` through ``transition_orders`` (restocking when it is
+    canceled). Raises InvalidTransition if Order.TRANSITIONS doesn't allow it.
+    """
+    if status == order.status:
+        return
+    result = transition_orders([order.pk], status)
+    if order.pk not in result.updated:
+        current = result.skipped.get(order.pk, order.status)
+        raise InvalidTransition(f"An order that is {current} can't be marked {status}.")
+    order.status = status
+    if status == "canceled":
+        order.stock_reserved = False
+    # Already audited by transition_orders; a later save() of ``order`` must not log it again.
+    getattr(order, "_audit_loaded", {})["status"] = status
+
+
+def expired_reservations():
+    """Pending, unpaid orders that have held their stock for over ORDER_RESERVATION_MINUTES."""
+    cutoff = timezone.now() - timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+    return Order.objects.filter(status="pending", payment_verified=False, stock_reserved=True, created_at__lt=cutoff)
+
+
+def release_expired_reservations(product_ids=None):
+    """
+    Cancel the expired reservations (only those holding one of ``product_ids`` when
+    given), putting their stock back. Returns the ids of the canceled orders.
+    """
+    expired = expired_reservations()
+    if product_ids is not None:
+        expired = expired.filter(items__product_id__in=product_ids)
+    order_ids = set(expired.values_list("id", flat=True))
+    if not order_ids:
+        return []
+    return transition_orders(order_ids, "canceled").updated
@@ -0,0 +1,38 @@
+from django.core.paginator import Paginator
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CountedPaginator(Paginator):
+    """Django paginator that trusts a precomputed total instead of issuing COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.__dict__["count"] = count
+
+
+class ReviewPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+    def __init__(self, count=None):
+        self.count = count
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountedPaginator(object_list, per_page, count=self.count)
+
+
+class ArchivedOrderPagination(CursorPagination):
+    """Keyset pages: no COUNT(*) and no OFFSET scans over the archive."""
+    ordering = "-created_at"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class AuditEventPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
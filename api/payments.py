@@ -0,0 +1,51 @@
+"""
+Razorpay payment signature verification.
+
+Razorpay signs ``"<razorpay_order_id>|<razorpay_payment_id>"`` with
+HMAC-SHA256 under the key secret. ``settings.PAYMENT_SIGNATURE_VERIFIER`` picks
+who checks it: the Razorpay SDK in production, or ``LocalSignatureVerifier``,
+the same check without the SDK, for load tests and offline development.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SignatureVerificationError(Exception):
+    pass
+
+
+def sign(razorpay_order_id, razorpay_payment_id, secret=None):
+    """The signature Razorpay's checkout returns for this order and payment."""
+    secret = settings.RAZORPAY_KEY_SECRET if secret is None else secret
+    message = f"{razorpay_order_id}|{razorpay_payment_id}"
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+class RazorpaySignatureVerifier:
+    def verify(self, razorpay_order_id, razorpay_payment_id, razorpay_signature):
+        import razorpay  # deferred: the SDK pulls in requests/urllib3 and only payment verification uses it
+
+        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+        try:
+            # Raises if the signature doesn't match
+            client.utility.verify_payment_signature({
+                "razorpay_order_id": razorpay_order_id,
+                "razorpay_payment_id": razorpay_payment_id,
+                "razorpay_signature": razorpay_signature,
+            })
+        except razorpay.errors.SignatureVerificationError as exc:
+            raise SignatureVerificationError(str(exc)) from exc
+
+
+class LocalSignatureVerifier:
+    def verify(self, razorpay_order_id, razorpay_payment_id, razorpay_signature):
+        expected = sign(razorpay_order_id, razorpay_payment_id)
+        if not hmac.compare_digest(expected, str(razorpay_signature or "")):
+            raise SignatureVerificationError("Razorpay Signature Verification Failed")
+
+
+def signature_verifier():
+    return import_string(settings.PAYMENT_SIGNATURE_VERIFIER)()
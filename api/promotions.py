@@ -0,0 +1,202 @@
+"""
+Promotion engine: automatic sales and coupons applied to a whole cart.
+
+The live promotions are loaded with one query and compiled into a
+``CompiledPromotions``, which indexes the automatic rules by product, by
+category and sitewide, and the coupon rules by code. The compiled set is kept
+per process and reused until the catalog version moves on (promotion changes
+bump it) or a promotion window opens or closes.
+
+Pricing a cart is a single pass over its lines. Each line looks up only the
+rules that can touch it. The matching automatic rules are then applied in
+priority order, and a line takes at most one sale. A coupon applies last, to
+whatever the sales left.
+"""
+import threading
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from .catalog import catalog_version
+from .models import Promotion
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+ZERO = Decimal("0.00")
+
+# ``key`` identifies the line in the result (cart item id, position in an order...).
+CartLine = namedtuple("CartLine", "key product_id category_id unit_price quantity")
+AppliedPromotion = namedtuple("AppliedPromotion", "id name code amount")
+PricedCart = namedtuple("PricedCart", "subtotal discount total line_discounts promotions")
+
+
+class InvalidCoupon(Exception):
+    pass
+
+
+def money(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class Rule:
+    __slots__ = (
+        "id", "name", "code", "kind", "value", "product_id", "category_id",
+        "buy_quantity", "get_quantity", "min_subtotal", "priority",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def matches(self, line):
+        if self.product_id is not None:
+            return line.product_id == self.product_id
+        if self.category_id is not None:
+            return line.category_id == self.category_id
+        return True
+
+    def discounts(self, lines, remaining):
+        """
+        Discount per line key for ``lines`` (all matching this rule), given each
+        line's amount still payable in ``remaining``. Empty when the rule doesn't apply.
+        """
+        eligible = sum((remaining[line.key] for line in lines), ZERO)
+        if not eligible or eligible < self.min_subtotal:
+            return {}
+        if self.kind == "percent":
+            amounts = {line.key: money(remaining[line.key] * self.value / HUNDRED) for line in lines}
+        elif self.kind == "fixed":
+            amounts = self._allocate(lines, remaining, min(self.value, eligible), eligible)
+        else:
+            amounts = self._buy_x_get_y(lines, remaining)
+        return {key: amount for key, amount in amounts.items() if amount > 0}
+
+    @staticmethod
+    def _allocate(lines, remaining, total, eligible):
+        """Split ``total`` across lines in proportion to what they cost; the last line takes the rounding."""
+        amounts, left = {}, money(total)
+        for line in lines[:-1]:
+            amount = min(money(total * remaining[line.key] / eligible), left)
+            amounts[line.key] = amount
+            left -= amount
+        amounts[lines[-1].key] = min(left, remaining[lines[-1].key])
+        return amounts
+
+    def _buy_x_get_y(self, lines, remaining):
+        # Every (buy + get) units, the cheapest ``get`` of them are value% off.
+        units = sum(line.quantity for line in lines)
+        free = units // (self.buy_quantity + self.get_quantity) * self.get_quantity
+        amounts = {}
+        for line in sorted(lines, key=lambda line: remaining[line.key] / line.quantity):
+            if not free:
+                break
+            count = min(free, line.quantity)
+            free -= count
+            amounts[line.key] = money(remaining[line.key] / line.quantity * count * self.value / HUNDRED)
+        return amounts
+
+
+class CompiledPromotions:
+    def __init__(self, rules, version=None, valid_until=None):
+        self.version = version
+        self.valid_until = valid_until
+        self.by_product, self.by_category, self.sitewide, self.coupons = {}, {}, [], {}
+        for rule in rules:
+            if rule.code:
+                self.coupons[rule.code] = rule
+            elif rule.product_id is not None:
+                self.by_product.setdefault(rule.product_id, []).append(rule)
+            elif rule.category_id is not None:
+                self.by_category.setdefault(rule.category_id, []).append(rule)
+            else:
+                self.sitewide.append(rule)
+
+    def __len__(self):
+        return (
+            sum(map(len, self.by_product.values())) + sum(map(len, self.by_category.values()))
+            + len(self.sitewide) + len(self.coupons)
+        )
+
+    @classmethod
+    def from_database(cls, now=None, version=None):
+        now = now or timezone.now()
+        rules, boundaries = [], []
+        # Future promotions are loaded only for their start time: the set expires then.
+        queryset = Promotion.objects.filter(is_active=True).exclude(ends_at__lte=now).values(
+            *(name for name in Rule.__slots__ if name not in ("product_id", "category_id")),
+            "product_id", "category_id", "starts_at", "ends_at",
+        )
+        for row in queryset:
+            starts_at, ends_at = row.pop("starts_at"), row.pop("ends_at")
+            if starts_at is not None and starts_at > now:
+                boundaries.append(starts_at)
+                continue
+            if ends_at is not None:
+                boundaries.append(ends_at)
+            rules.append(Rule(**row))
+        return cls(rules, version=version, valid_until=min(boundaries, default=None))
+
+    def apply(self, lines, coupon=None):
+        """Price ``lines`` (CartLine tuples); raises InvalidCoupon when ``coupon`` is unknown or doesn't apply."""
+        remaining = {line.key: money(line.unit_price * line.quantity) for line in lines}
+        subtotal = sum(remaining.values(), ZERO)
+
+        matched = dict.fromkeys(self.sitewide, lines) if lines else {}
+        for line in lines:
+            for rule in self.by_product.get(line.product_id, ()):
+                matched.setdefault(rule, []).append(line)
+            for rule in self.by_category.get(line.category_id, ()):
+                matched.setdefault(rule, []).append(line)
+
+        line_discounts, applied, claimed = {}, [], set()
+        for rule in sorted(matched, key=lambda rule: (-rule.priority, rule.id)):
+            rule_lines = [line for line in matched[rule] if line.key not in claimed]
+            if rule_lines:
+                amounts = rule.discounts(rule_lines, remaining)
+                if amounts:
+                    claimed.update(line.key for line in rule_lines)
+                    self._record(rule, amounts, remaining, line_discounts, applied)
+
+        if coupon:
+            rule = self.coupons.get(coupon.strip().upper())
+            if rule is None:
+                raise InvalidCoupon("This coupon code is not valid.")
+            rule_lines = [line for line in lines if rule.matches(line)]
+            amounts = rule.discounts(rule_lines, remaining) if rule_lines else {}
+            if not amounts:
+                raise InvalidCoupon("This coupon does not apply to your cart.")
+            self._record(rule, amounts, remaining, line_discounts, applied)
+
+        discount = sum(line_discounts.values(), ZERO)
+        return PricedCart(subtotal, discount, subtotal - discount, line_discounts, applied)
+
+    @staticmethod
+    def _record(rule, amounts, remaining, line_discounts, applied):
+        for key, amount in amounts.items():
+            remaining[key] -= amount
+            line_discounts[key] = line_discounts.get(key, ZERO) + amount
+        applied.append(AppliedPromotion(rule.id, rule.name, rule.code, sum(amounts.values(), ZERO)))
+
+
+_compiled = None
+_lock = threading.Lock()
+
+
+def active_promotions():
+    """The process's compiled promotions, recompiled when stale (see module docstring)."""
+    global _compiled
+    version, now = catalog_version(), timezone.now()
+    compiled = _compiled
+    if (
+        compiled is None
+        or compiled.version != version
+        or (compiled.valid_until is not None and now >= compiled.valid_until)
+    ):
+        with _lock:
+            compiled = _compiled = CompiledPromotions.from_database(now=now, version=version)
+    return compiled
+
+
+def price_cart(lines, coupon=None):
+    return active_promotions().apply(lines, coupon)
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.db.models import Count
+
+from .metrics import metrics
+from .models import Review
+
+# Histograms are refreshed on every review write; the timeout only bounds how long a
+# worker with a process-local cache can serve a histogram another worker has changed.
+HISTOGRAM_TIMEOUT = 60 * 60
+STARS = range(1, 6)
+
+
+def _histogram_key(product_id):
+    return f"reviews:histogram:{product_id}"
+
+
+def compute_histogram(product_id):
+    """Count reviews per star (1-5) for a product with one grouped query."""
+    histogram = {star: 0 for star in STARS}
+    rows = (
+        Review.objects.filter(product_id=product_id)
+        .order_by()
+        .values_list("rating")
+        .annotate(count=Count("id"))
+    )
+    for rating, count in rows:
+        histogram[rating] = count
+    return histogram
+
+
+def refresh_histogram(product_id):
+    histogram = compute_histogram(product_id)
+    cache.set(_histogram_key(product_id), histogram, HISTOGRAM_TIMEOUT)
+    return histogram
+
+
+def rating_histogram(product_id):
+    """Cached per-star review counts for a product."""
+    histogram = cache.get(_histogram_key(product_id))
+    metrics.cache_lookup("review_histogram", histogram is not None)
+    if histogram is None:
+        histogram = refresh_histogram(product_id)
+    return histogram
+
+
+def summarize(histogram):
+    """Review count and average rating (rounded like ProductSerializer) from a histogram."""
+    count = sum(histogram.values())
+    if not count:
+        return count, 0
+    return count, round(sum(star * n for star, n in histogram.items()) / count, 1)
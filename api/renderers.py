@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def orjson_default(obj):
+    """Encode anything orjson passes through exactly like DRF's JSONEncoder does."""
+    return _drf_encoder.default(obj)
+
+if orjson is not None:
+    # Datetimes and dataclasses are passed through so they get DRF's representation
+    # ("Z" suffix for UTC, etc.) rather than orjson's own.
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Output matches DRF's JSONRenderer with the default UNICODE_JSON and
+    COMPACT_JSON settings for everything but floats: types orjson doesn't
+    natively render the same way (datetimes, Decimals, lazy strings,
+    querysets...) go through DRF's own encoder, and \\u2028/\\u2029 are
+    escaped. Floats parse back to the same value but may be spelled differently
+    (``1e16`` rather than ``1e+16``), and NaN/Infinity render as ``null``
+    instead of raising. Data orjson refuses (integers wider than 64 bits) falls
+    back to the stdlib path, as do pretty-printed (``; indent=``), ASCII-only and
+    non-compact output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=orjson_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
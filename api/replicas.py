@@ -0,0 +1,104 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+``ReplicaReadMixin`` marks safe requests on the catalog viewsets as replica
+reads; ``ReplicaRouter`` then sends their queries to one of
+``settings.DATABASE_REPLICAS``. Everything else - writes, reads inside a
+transaction, reads after the request wrote, and every request from a client
+that wrote within the last ``DATABASE_REPLICA_STICKY_SECONDS`` - uses
+``default``. ``ReplicaStickinessMiddleware`` records those writes. A view
+sets ``require_primary`` to keep a request off the replicas, as
+``CatalogCacheMixin`` does for responses it is going to cache.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+_replica_alias = ContextVar("replica_alias", default=None)
+_request_wrote = ContextVar("request_wrote", default=None)
+
+
+def _sticky_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"db:sticky:user:{user.pk}"
+    # Same client address as the throttles: X-Forwarded-For minus NUM_PROXIES hops,
+    # not REMOTE_ADDR, which behind a load balancer is the balancer for everyone.
+    return f"db:sticky:ip:{BaseThrottle().get_ident(request)}"
+
+
+def is_sticky(request):
+    return cache.get(_sticky_key(request)) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica_alias.get()
+        wrote = _request_wrote.get()
+        if alias is None or (wrote and wrote[0]) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        wrote = _request_wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """Pin a client to the primary for a short window after any request that wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote = [False]
+        token = _request_wrote.set(wrote)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_wrote.reset(token)
+        if wrote[0] and settings.DATABASE_REPLICAS:
+            # DRF copies the authenticated user onto the Django request, so JWT users
+            # are keyed by id here; anonymous writers fall back to their address. The
+            # settings refuse replicas without a shared cache, so every worker sees the pin.
+            cache.set(_sticky_key(request), 1, settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica unless the client recently wrote."""
+    require_primary = False
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS and request.method in SAFE_METHODS
+            and not self.require_primary and not is_sticky(request)
+        ):
+            _replica_alias.set(random.choice(settings.DATABASE_REPLICAS))
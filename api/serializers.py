@@ -1,5 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from .order_transitions import (
+    InsufficientStock,
+    InvalidTransition,
+    adjust_stock,
+    release_expired_reservations,
+    update_order_status,
+)
+from .promotions import CartLine, InvalidCoupon, price_cart
 from .models import (
     Category,
     Product,
@@ -10,6 +19,9 @@ from .models import (
     ContactMessage,
     Review,
     Wishlist,
+    ArchivedOrder,
+    ArchivedOrderItem,
+    AuditEvent,
 )
 
 User = get_user_model()
@@ -28,6 +40,10 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+    # Checkouts only bump the catalog version when availability changes, so in cached
+    # catalog responses the levels can lag; GET /api/products/stock/ is live.
+    in_stock = serializers.SerializerMethodField()
+    low_stock = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -43,6 +59,8 @@ class ProductSerializer(serializers.ModelSerializer):
             "is_featured",
             "stock_quantity",
             "low_stock_threshold",
+            "in_stock",
+            "low_stock",
             "average_rating",
             "review_count",
         ]
@@ -57,6 +75,19 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_review_count(self, obj):
         return obj.reviews.count()
 
+    def get_in_stock(self, obj):
+        return obj.is_in_stock
+
+    def get_low_stock(self, obj):
+        return obj.is_low_stock
+
+
+class LowStockProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ["id", "title", "slug", "stock_quantity", "low_stock_threshold"]
+        read_only_fields = fields
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -67,29 +98,118 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["id", "product", "product_id", "size", "quantity", "price"]
+        # Priced from the catalog at checkout
+        read_only_fields = ["price"]
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     user = serializers.StringRelatedField(read_only=True)
+    coupon = serializers.CharField(write_only=True, required=False, allow_blank=True, max_length=30)
 
     class Meta:
         model = Order
-        fields = ["id", "user", "status", "created_at", "total_amount", "items"]
-        read_only_fields = ["id", "user", "created_at", "total_amount"]
+        fields = ["id", "user", "status", "created_at", "total_amount", "discount_amount", "coupon_code", "coupon", "items"]
+        read_only_fields = ["id", "user", "created_at", "total_amount", "discount_amount", "coupon_code"]
 
     def create(self, validated_data):
         items_data = validated_data.pop("items")
-        order = Order.objects.create(**validated_data)
-        total = 0
+        coupon = validated_data.pop("coupon", "").strip().upper()
+        lines = [
+            CartLine(index, item["product"].pk, item["product"].category_id, item["product"].price, item.get("quantity", 1))
+            for index, item in enumerate(items_data)
+        ]
+        try:
+            priced = price_cart(lines, coupon)
+        except InvalidCoupon as exc:
+            raise serializers.ValidationError({"coupon": [str(exc)]})
+        taken = {}
         for item_data in items_data:
-            product = item_data.pop("product")
-            price = product.price
-            OrderItem.objects.create(order=order, product=product, price=price, **item_data)
-            total += price * item_data.get("quantity", 1)
-        order.total_amount = total
-        order.save()
+            product_id = item_data["product"].pk
+            taken[product_id] = taken.get(product_id, 0) - item_data.get("quantity", 1)
+        with transaction.atomic():
+            try:
+                self._reserve_stock(taken)
+            except InsufficientStock as exc:
+                titles = {item["product"].pk: item["product"].title for item in items_data}
+                raise serializers.ValidationError({
+                    "items": [f"Not enough stock of {titles[product_id]}." for product_id in exc.product_ids],
+                })
+            order = Order.objects.create(
+                total_amount=priced.total,
+                discount_amount=priced.discount,
+                coupon_code=coupon,
+                stock_reserved=True,
+                **validated_data,
+            )
+            # Item prices stay list prices; the order carries the discount.
+            for item_data in items_data:
+                product = item_data.pop("product")
+                OrderItem.objects.create(order=order, product=product, price=product.price, **item_data)
         return order
 
+    @staticmethod
+    def _reserve_stock(taken):
+        try:
+            adjust_stock(taken)
+        except InsufficientStock as exc:
+            # Unpaid orders past ORDER_RESERVATION_MINUTES give their stock back first.
+            if not release_expired_reservations(exc.product_ids):
+                raise
+            adjust_stock(taken)
+
+    def validate_status(self, value):
+        request = self.context.get("request")
+        if self.instance is not None and value != self.instance.status and not (request and request.user.is_staff):
+            if value != "canceled":
+                raise serializers.ValidationError("You can only cancel an order.")
+        return value
+
+    def update(self, instance, validated_data):
+        # Status changes go through Order.TRANSITIONS, and canceling returns the stock.
+        if "items" in validated_data:
+            raise serializers.ValidationError({"items": ["The items of an order can't be changed."]})
+        status = validated_data.pop("status", instance.status)
+        with transaction.atomic():
+            try:
+                update_order_status(instance, status)
+            except InvalidTransition as exc:
+                raise serializers.ValidationError({"status": [str(exc)]})
+            return super().update(instance, validated_data)
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product_title = serializers.CharField(source="product.title", read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ["id", "product", "product_title", "size", "quantity", "price"]
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            "id", "user", "status", "created_at", "total_amount", "discount_amount", "coupon_code",
+            "shipping_name", "shipping_phone", "shipping_address", "shipping_city", "shipping_state", "shipping_pincode",
+            "payment_method", "payment_verified", "archived_at", "items",
+        ]
+        read_only_fields = fields
+
+class BulkOrderStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000)
+    status = serializers.ChoiceField(choices=[
+        choice for choice in Order.STATUS_CHOICES if Order.statuses_leading_to(choice[0])
+    ])
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    actor = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = AuditEvent
+        fields = ["id", "entity_type", "entity_id", "action", "changes", "actor", "actor_id", "source", "created_at"]
+        read_only_fields = fields
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
@@ -148,6 +268,15 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "product_title", "user", "rating", "comment", "created_at", "verified_purchase"]
         read_only_fields = ["id", "user", "created_at", "verified_purchase"]
 
+class ProductReviewSerializer(serializers.ModelSerializer):
+    """Review row for a single product's feed; the product is sent once, not per row."""
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ["id", "user", "rating", "comment", "created_at", "verified_purchase"]
+        read_only_fields = fields
+
 class WishlistSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
@@ -158,3 +287,6 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = ["id", "user", "product", "product_id", "added_at"]
         read_only_fields = ["id", "user", "added_at"]
+
+class WishlistContainsSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(child=serializers.IntegerField(), max_length=500)
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import audit
+from .catalog import catalog_changed
+from .models import Category, Order, Product, ProductSize, Promotion, Review, Wishlist
+from .order_events import publish_order_status
+from .order_transitions import restock
+from .ratings import refresh_histogram
+from .wishlists import invalidate_wishlist
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: refresh_histogram(product_id))
+    catalog_changed()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def catalog_row_changed(sender, **kwargs):
+    catalog_changed()
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def wishlist_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_wishlist(user_id))
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    # Feeds the order tracking event stream: payment verification, admin status edits, ...
+    order_id, status, payment_verified = instance.pk, instance.status, instance.payment_verified
+    transaction.on_commit(lambda: publish_order_status(order_id, status, payment_verified))
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # Deleting an order that could still be canceled cancels it: its reserved stock goes
+    # back. Shipped and delivered orders used theirs (archive_orders deletes those).
+    if instance.stock_reserved and instance.status in Order.statuses_leading_to("canceled"):
+        restock([instance.pk])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Review)
+def audited_row_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:  # fixtures
+        audit.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Review)
+def audited_row_deleted(sender, instance, **kwargs):
+    audit.record_delete(instance)
@@ -0,0 +1,66 @@
+"""
+Import-time profile of a cold process start, used by ``manage.py profile_startup``
+and the startup regression test.
+
+The profile runs in a fresh interpreter with ``-X importtime`` so modules
+already imported by the calling process don't hide their cost.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+
+ImportTime = namedtuple("ImportTime", "module self_us cumulative_us depth")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# django.setup() plus the URLconf, i.e. every view module: what a worker imports
+# before it can serve its first request.
+_STARTUP = (
+    "import django; django.setup(); "
+    "from importlib import import_module; from django.conf import settings; "
+    "import_module(settings.ROOT_URLCONF)"
+)
+
+
+class StartupProfile:
+    def __init__(self, seconds, imports):
+        self.seconds = seconds
+        self.imports = imports
+
+    @property
+    def modules(self):
+        return {row.module for row in self.imports}
+
+    @property
+    def import_seconds(self):
+        return sum(row.self_us for row in self.imports) / 1_000_000
+
+    def by_package(self):
+        """Self time summed per top-level package, slowest first."""
+        totals = defaultdict(int)
+        for row in self.imports:
+            totals[row.module.partition(".")[0]] += row.self_us
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def profile_startup(urls=True):
+    code = _STARTUP if urls else "import django; django.setup()"
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    seconds = time.perf_counter() - start
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(ImportTime(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return StartupProfile(seconds, imports)
@@ -0,0 +1,122 @@
+"""
+Server-Sent Events stream of an order's status for the tracking page.
+
+``GET /api/orders/<id>/events/`` sends the current status, then every
+change, and ends once the order is delivered or canceled, or after
+``ORDER_STREAM_MAX_SECONDS``. The browser's EventSource reconnects by
+itself. EventSource cannot send headers, so instead of the JWT it may pass
+``?ticket=`` from ``POST /api/orders/<id>/events/ticket/``: a signed ticket
+for that one order that expires after ``ORDER_STREAM_TICKET_SECONDS``. The
+URL ends up in access logs, which is why the access token itself is never
+accepted there. On a 401 the page fetches a new ticket.
+
+Under ASGI with a shared cache the stream waits on the event loop's
+``OrderStatusHub``. Elsewhere it is not a stream: a WSGI worker thread held
+per open page would starve the pool, and without a shared cache the hub
+never sees changes published by other workers. There the endpoint answers
+with the current status and a ``retry`` of ``ORDER_STREAM_SNAPSHOT_RETRY_SECONDS``,
+so EventSource polls by reconnecting.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .models import Order
+from .order_events import order_status_hub
+
+RETRY_MS = 3000
+TICKET_SALT = "api.streams.order-events"
+
+
+def stream_ticket(user_id, order_id):
+    return signing.dumps([user_id, order_id], salt=TICKET_SALT)
+
+
+def _ticket_user(ticket, order_id):
+    try:
+        user_id, ticket_order_id = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.ORDER_STREAM_TICKET_SECONDS)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    if ticket_order_id != order_id:
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+def _authenticate(request, order_id):
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        ticket = request.GET.get("ticket")
+        return _ticket_user(ticket, order_id) if ticket else None
+    raw_token = auth.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _event(order_id, state):
+    data = json.dumps({"order_id": order_id, **state})
+    return f"event: status\ndata: {data}\n\n"
+
+
+def _state(value):
+    return {"status": value["status"], "payment_verified": value["payment_verified"]}
+
+
+async def _current_state(order_id):
+    return await Order.objects.filter(pk=order_id).values("status", "payment_verified").afirst()
+
+
+async def _async_events(order_id):
+    hub = order_status_hub()
+    queue = await hub.subscribe(order_id)
+    try:
+        # Read after subscribing, so a change between the two is delivered rather than lost.
+        state = await _current_state(order_id)
+        if state is None:
+            return  # deleted since the permission check; the reconnect gets a 404
+        yield f"retry: {RETRY_MS}\n" + _event(order_id, state)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ORDER_STREAM_MAX_SECONDS
+        while state["status"] not in Order.FINAL_STATUSES and loop.time() < deadline:
+            timeout = min(settings.ORDER_STREAM_HEARTBEAT, deadline - loop.time())
+            try:
+                value = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if _state(value) != state:
+                state = _state(value)
+                yield _event(order_id, state)
+    finally:
+        hub.unsubscribe(order_id, queue)
+
+
+async def order_status_stream(request, pk):
+    user = await sync_to_async(_authenticate)(request, pk)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    order = await Order.objects.filter(pk=pk).values("user_id", "status", "payment_verified").afirst()
+    if order is None or (order["user_id"] != user.pk and not user.is_staff):
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    if isinstance(request, ASGIRequest) and settings.SHARED_CACHE:
+        response = StreamingHttpResponse(_async_events(pk), content_type="text/event-stream")
+        response["X-Accel-Buffering"] = "no"  # let nginx-style proxies pass events through immediately
+    else:
+        retry = f"retry: {settings.ORDER_STREAM_SNAPSHOT_RETRY_SECONDS * 1000}\n"
+        response = HttpResponse(retry + _event(pk, _state(order)), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,205 @@
+"""
+In-process typeahead index over product titles and category names.
+
+Every distinct suggestion text is stored once, in rank order (categories,
+then in-stock, featured and most-reviewed products first), so a suggestion's
+id is also its rank. The index holds one entry per word start, as two compact
+arrays (suggestion id, character offset) sorted by the text from that offset.
+A prefix is therefore a contiguous range found by binary search. A segment
+tree over the suggestion ids yields the best N suggestions in that range in
+O(N log n), however many entries the prefix matches.
+
+The index is built on first use and rebuilt lazily once the catalog version
+moves on: the request that notices starts a background rebuild (at most one
+per ``SUGGEST_REBUILD_INTERVAL`` seconds per process) and requests keep using
+the previous index until the new one replaces it.
+"""
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from heapq import heappop, heappush
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from .catalog import catalog_version
+from .models import Category, Product
+
+CATEGORY, PRODUCT = 0, 1
+# Word starts indexed per suggestion, and the furthest offset the array can hold.
+MAX_WORDS = 8
+MAX_OFFSET = 255
+
+
+def _word_starts(text):
+    starts = []
+    previous = " "
+    for offset, char in enumerate(text):
+        if offset > MAX_OFFSET or len(starts) == MAX_WORDS:
+            break
+        if char.isalnum() and not previous.isalnum():
+            starts.append(offset)
+        previous = char
+    return starts
+
+
+class SuggestionIndex:
+    def __init__(self, candidates, version=None):
+        """``candidates``: (kind, text, ref) tuples, best-ranked first; ref is the product or category id."""
+        self.version = version
+        self.texts = []
+        self.kinds = array("B")
+        self.refs = array("q")
+        seen = set()
+        for kind, text, ref in candidates:
+            text = " ".join(text.split())
+            if not text or (kind, text.casefold()) in seen:
+                continue
+            seen.add((kind, text.casefold()))
+            self.texts.append(text)
+            self.kinds.append(kind)
+            self.refs.append(ref)
+        self.category_slugs = {}
+
+        suggestion_ids, offsets = array("I"), array("B")
+        for suggestion_id, text in enumerate(self.texts):
+            for offset in _word_starts(text):
+                suggestion_ids.append(suggestion_id)
+                offsets.append(offset)
+        texts = self.texts
+        order = sorted(range(len(offsets)), key=lambda i: texts[suggestion_ids[i]][offsets[i]:].casefold())
+        self.entry_ids = array("I", (suggestion_ids[i] for i in order))
+        self.entry_offsets = array("B", (offsets[i] for i in order))
+        self._build_tree()
+
+    def _build_tree(self):
+        """Segment tree holding, per node, the entry with the best (lowest) suggestion id."""
+        self.count = n = len(self.entry_ids)
+        self.size = size = 1 << max(n - 1, 0).bit_length()
+        # A suggestion id is its rank; entry ``n`` is a sentinel ranked after everything.
+        ranks = self.entry_ids
+        ranks.append(len(self.texts))
+        tree = self.tree = array("I", [n]) * (2 * size)
+        tree[size:size + n] = array("I", range(n))
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if ranks[left] <= ranks[right] else right
+
+    @classmethod
+    def from_database(cls, version=None):
+        categories = list(Category.objects.order_by("name").values_list("id", "name", "slug"))
+        products = (
+            Product.objects.order_by()
+            .annotate(review_count=Count("reviews"))
+            .values_list("id", "title", "stock_quantity", "is_featured", "review_count")
+        )
+        ranked = sorted(
+            products.iterator(chunk_size=5000),
+            key=lambda p: (p[2] <= 0, not p[3], -p[4], len(p[1]), p[1]),
+        )
+        candidates = [(CATEGORY, name, pk) for pk, name, _ in categories]
+        candidates += [(PRODUCT, title, pk) for pk, title, *_ in ranked]
+        index = cls(candidates, version=version)
+        index.category_slugs = {pk: slug for pk, _, slug in categories}
+        return index
+
+    def _suffix(self, entry):
+        return self.texts[self.entry_ids[entry]][self.entry_offsets[entry]:].casefold()
+
+    def _best(self, lo, hi):
+        """Entry with the best rank in [lo, hi)."""
+        tree, ranks = self.tree, self.entry_ids
+        best = self.count
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                if ranks[tree[lo]] < ranks[best]:
+                    best = tree[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                if ranks[tree[hi]] < ranks[best]:
+                    best = tree[hi]
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def suggest(self, query, limit=8):
+        prefix = " ".join(query.split()).casefold()
+        if not prefix or not self.count:
+            return []
+        entries = range(self.count)
+        lo = bisect_left(entries, prefix, key=self._suffix)
+        hi = bisect_left(entries, prefix + "\U0010ffff", lo=lo, key=self._suffix)
+
+        heap, seen, found = [], set(), []
+
+        def push(start, stop):
+            if start < stop:
+                entry = self._best(start, stop)
+                heappush(heap, (self.entry_ids[entry], entry, start, stop))
+
+        push(lo, hi)
+        while heap and len(found) < limit:
+            suggestion_id, entry, start, stop = heappop(heap)
+            if suggestion_id not in seen:
+                seen.add(suggestion_id)
+                found.append(suggestion_id)
+            push(start, entry)
+            push(entry + 1, stop)
+        return [self._payload(suggestion_id) for suggestion_id in found]
+
+    def _payload(self, suggestion_id):
+        ref = self.refs[suggestion_id]
+        if self.kinds[suggestion_id] == CATEGORY:
+            return {"type": "category", "text": self.texts[suggestion_id], "id": ref, "slug": self.category_slugs.get(ref)}
+        return {"type": "product", "text": self.texts[suggestion_id], "id": ref}
+
+    def nbytes(self):
+        arrays = (self.kinds, self.refs, self.entry_ids, self.entry_offsets, self.tree)
+        return (
+            sum(a.itemsize * len(a) for a in arrays)
+            + sys.getsizeof(self.texts)
+            + sum(sys.getsizeof(text) for text in self.texts)
+        )
+
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def _rebuild(version):
+    global _index, _built_at
+    _index = SuggestionIndex.from_database(version=version)
+    _built_at = time.monotonic()
+
+
+def _rebuild_in_background(version):
+    try:
+        _rebuild(version)
+    finally:
+        connections.close_all()  # this thread's own connections
+        _lock.release()
+
+
+def suggestion_index():
+    """The process's index; a stale one starts a background rebuild (see module docstring)."""
+    version = catalog_version()
+    index = _index
+    if index is None:
+        with _lock:
+            if _index is None:
+                _rebuild(version)
+        return _index
+    if (
+        index.version != version
+        and time.monotonic() - _built_at >= settings.SUGGEST_REBUILD_INTERVAL
+        and _lock.acquire(blocking=False)
+    ):
+        threading.Thread(target=_rebuild_in_background, args=(version,), daemon=True).start()
+    return index
@@ -1,8 +1,62 @@
+import datetime
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+from asgiref.sync import sync_to_async
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection, transaction
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework import status, viewsets
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
-from .models import Product, Category, CartItem
+from .metrics import metrics
+from .order_events import order_status_key, publish_order_status
+from .streams import _async_events
+from .order_transitions import transition_orders
+from .fast_serializers import CompiledCategorySerializer, CompiledProductSerializer
+from .compression import negotiate
+from .db_metrics import ConnectionMetrics
+from .feeds import build_feeds, read_manifest
+from .loadtest import EndpointStats, run_load_test
+from .parsers import FastJSONParser
+from .payments import sign
+from . import promotions
+from .audit import audit_batch
+from .promotions import CartLine, CompiledPromotions, InvalidCoupon, Rule
+from .caching import CatalogCacheMixin
+from .catalog import CATALOG_VERSION_KEY, catalog_version
+from .replicas import ReplicaReadMixin, ReplicaRouter, ReplicaStickinessMiddleware, _replica_alias, is_sticky
+from .renderers import FastJSONRenderer
+from .serializers import CategorySerializer, ProductSerializer
+from .startup import profile_startup
+from . import suggest
+from .suggest import SuggestionIndex, CATEGORY, PRODUCT
+from .throttling import TokenBucketThrottle
+from .warmup import warm_up
+from .models import (
+    Product, ProductSize, Category, CartItem, InventorySnapshot, RestockAlert, Review, Order, OrderItem,
+    Wishlist, ArchivedOrder, ArchivedOrderItem, Promotion, AuditEvent,
+)
+from .management.commands.archive_orders import months_before
 
 User = get_user_model()
 
@@ -66,3 +120,1191 @@ class RegisterTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(User.objects.count(), 1)
         self.assertEqual(User.objects.get().username, 'newuser')
+
+class InventoryTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='staffpassword', is_staff=True)
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        self.plenty = Product.objects.create(
+            title='Plenty', slug='plenty', category=self.category, price=10, stock_quantity=50
+        )
+        self.low = Product.objects.create(
+            title='Low', slug='low', category=self.category, price=10, stock_quantity=3
+        )
+        self.empty = Product.objects.create(
+            title='Empty', slug='empty', category=self.category, price=10, stock_quantity=0
+        )
+
+    def test_low_stock_listing_is_staff_only(self):
+        url = reverse('product-low-stock')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=self.staff)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.empty.id, self.low.id])
+
+    def test_low_stock_queryset_matches_property(self):
+        expected = {p.id for p in Product.objects.all() if p.is_low_stock}
+        self.assertEqual(set(Product.objects.low_stock().values_list('id', flat=True)), expected)
+
+    def test_snapshot_alerts_only_on_threshold_crossings(self):
+        call_command('inventory_snapshot', stdout=StringIO())
+        self.assertEqual(RestockAlert.objects.get().product_ids, [self.low.id, self.empty.id])
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Nothing changed: a new snapshot is recorded but no alert is raised.
+        call_command('inventory_snapshot', stdout=StringIO())
+        self.assertEqual(InventorySnapshot.objects.count(), 2)
+        self.assertEqual(RestockAlert.objects.count(), 1)
+
+        Product.objects.filter(pk=self.plenty.pk).update(stock_quantity=2)
+        call_command('inventory_snapshot', stdout=StringIO())
+        self.assertEqual(RestockAlert.objects.first().product_ids, [self.plenty.id])
+        self.assertEqual(len(mail.outbox), 2)
+
+class ProductFacetTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        self.users = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(2)]
+        self.cheap = self.make_product('cheap', 300, ['S', 'M'], ratings=[5, 4])
+        self.mid = self.make_product('mid', 1500, ['M', 'L'], ratings=[2], featured=True)
+        self.pricey = self.make_product('pricey', 6000, ['XL'])
+
+    def make_product(self, slug, price, sizes, ratings=(), featured=False):
+        product = Product.objects.create(
+            title=slug.title(), slug=slug, category=self.category, price=price,
+            is_featured=featured, stock_quantity=10,
+        )
+        ProductSize.objects.bulk_create([ProductSize(product=product, size=size) for size in sizes])
+        for user, rating in zip(self.users, ratings):
+            Review.objects.create(product=product, user=user, rating=rating)
+        return product
+
+    def test_filters(self):
+        url = reverse('product-list')
+        response = self.client.get(url, {'size': 'M', 'min_rating': 4})
+        self.assertEqual([p['id'] for p in response.data], [self.cheap.id])
+        response = self.client.get(url, {'min_price': 1000, 'featured': 'true'})
+        self.assertEqual([p['id'] for p in response.data], [self.mid.id])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('product-list'), {'min_price': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_facet_counts_in_one_query(self):
+        # one query for the page (compiled serializer), one for all facet counts
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'), {'facets': 'true', 'size': 'M'})
+        facets = response.data['facets']
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(facets['total'], 2)
+        # The size facet ignores its own selection so other sizes stay discoverable.
+        self.assertEqual(facets['size'], {'S': 1, 'M': 2, 'L': 1, 'XL': 1})
+        self.assertEqual(facets['price'], {'0-500': 1, '500-1000': 0, '1000-2000': 1, '2000-5000': 0, '5000+': 0})
+        self.assertEqual(facets['rating'], {'4': 1, '3': 1, '2': 2, '1': 2})
+        self.assertEqual(facets['featured'], 1)
+
+class VerifiedPurchaseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='buyerpassword')
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        self.product = Product.objects.create(title='Tee', slug='tee', category=self.category, price=10)
+        self.other = Product.objects.create(title='Polo', slug='polo', category=self.category, price=20)
+        self.order = Order.objects.create(user=self.user, status='delivered')
+        OrderItem.objects.create(order=self.order, product=self.product, size='M', price=10)
+        self.client.force_authenticate(user=self.user)
+
+    def test_review_of_delivered_purchase_is_verified(self):
+        url = reverse('review-list')
+        response = self.client.post(url, {'product': self.product.id, 'rating': 5}, format='json')
+        self.assertTrue(response.data['verified_purchase'])
+        response = self.client.post(url, {'product': self.other.id, 'rating': 4}, format='json')
+        self.assertFalse(response.data['verified_purchase'])
+
+    def test_undelivered_order_is_not_a_verified_purchase(self):
+        Order.objects.filter(pk=self.order.pk).update(status='shipped')
+        response = self.client.post(reverse('review-list'), {'product': self.product.id, 'rating': 5}, format='json')
+        self.assertFalse(response.data['verified_purchase'])
+
+    def test_backfill(self):
+        stale = Review.objects.create(product=self.product, user=self.user, rating=5)
+        wrong = Review.objects.create(product=self.other, user=self.user, rating=3, verified_purchase=True)
+        call_command('backfill_verified_purchases', batch_size=1, stdout=StringIO())
+        stale.refresh_from_db()
+        wrong.refresh_from_db()
+        self.assertTrue(stale.verified_purchase)
+        self.assertFalse(wrong.verified_purchase)
+
+class ProductReviewFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        self.product = Product.objects.create(title='Tee', slug='tee', category=self.category, price=10)
+        self.users = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(12)]
+        for i, user in enumerate(self.users):
+            Review.objects.create(product=self.product, user=user, rating=i % 5 + 1)
+        self.url = reverse('product-reviews', args=[self.product.id])
+
+    def test_feed_is_paginated_with_histogram(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('product_title', response.data['results'][0])
+        self.assertEqual(response.data['product'], {'id': self.product.id, 'title': 'Tee'})
+        self.assertEqual(response.data['histogram'], {1: 3, 2: 3, 3: 2, 4: 2, 5: 2})
+        self.assertEqual(response.data['average_rating'], 2.8)
+
+    def test_cached_feed_takes_two_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_histogram_is_refreshed_on_review_writes(self):
+        self.client.get(self.url)
+        user = User.objects.create_user(username='late', password='pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=user, rating=5)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['histogram'][5], 3)
+        self.assertEqual(response.data['count'], 13)
+
+    def test_unknown_product(self):
+        response = self.client.get(reverse('product-reviews', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class WishlistContainsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='shopper', password='shopperpassword')
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        self.products = [
+            Product.objects.create(title=f'P{i}', slug=f'p{i}', category=self.category, price=10)
+            for i in range(3)
+        ]
+        Wishlist.objects.create(user=self.user, product=self.products[1])
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('wishlist-contains')
+
+    def test_contains_uses_cached_set(self):
+        ids = [p.id for p in self.products]
+        response = self.client.post(self.url, {'product_ids': ids}, format='json')
+        self.assertEqual(response.data, {'wishlisted': [self.products[1].id]})
+        with self.assertNumQueries(0):
+            self.client.post(self.url, {'product_ids': ids}, format='json')
+
+    def test_cache_follows_create_and_destroy(self):
+        ids = [p.id for p in self.products]
+        self.client.post(self.url, {'product_ids': ids}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('wishlist-list'), {'product_id': self.products[0].id}, format='json')
+        response = self.client.post(self.url, {'product_ids': ids}, format='json')
+        self.assertEqual(response.data['wishlisted'], [self.products[0].id, self.products[1].id])
+
+        entry = Wishlist.objects.get(product=self.products[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('wishlist-detail', args=[entry.id]))
+        response = self.client.post(self.url, {'product_ids': ids}, format='json')
+        self.assertEqual(response.data['wishlisted'], [self.products[0].id])
+
+    @override_settings(WISHLIST_CACHE_TIMEOUT=0)
+    def test_cache_timeout_setting(self):
+        # Without a shared cache other workers' copies only go away by expiring.
+        ids = [p.id for p in self.products]
+        self.client.post(self.url, {'product_ids': ids}, format='json')
+        Wishlist.objects.create(user=self.user, product=self.products[0])
+        response = self.client.post(self.url, {'product_ids': ids}, format='json')
+        self.assertEqual(response.data['wishlisted'], [self.products[0].id, self.products[1].id])
+
+class FastJSONTests(APITestCase):
+    payload = {
+        'price': Decimal('1299.50'),
+        'created_at': datetime.datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=datetime.timezone.utc),
+        'local': timezone.make_aware(datetime.datetime(2025, 6, 1, 12), datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+        'day': datetime.date(2025, 1, 2),
+        'ref': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'title': 'Kurta \u2028 ₹ — ✓',
+        'histogram': {1: 3, 5: 2},
+        'items': ({'n': 1.5}, None, True),
+    }
+
+    def test_renderer_matches_drf_output(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indented_output_matches_drf(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload, media_type),
+            JSONRenderer().render(self.payload, media_type),
+        )
+
+    def test_out_of_range_integers_fall_back_to_stdlib(self):
+        payload = {'big': 2 ** 70, 'negative': -(2 ** 64)}
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render(self.payload)
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"price": NaN}'))
+
+class CompiledSerializerParityTests(APITestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        categories = [Category.objects.create(name=f'Cat {i}', slug=f'cat-{i}') for i in range(4)]
+        users = [User.objects.create_user(username=f'reviewer{i}', password='pw') for i in range(6)]
+        for i in range(40):
+            product = Product.objects.create(
+                title=rng.choice(['Tee', 'Kurta ₹', 'Denim — slim', 'Polo']) + f' {i}',
+                slug=f'product-{i}',
+                category=rng.choice(categories),
+                price=Decimal(rng.randint(1, 999999)) / 100,
+                description=rng.choice(['', 'Cotton', 'Line\nbreak']),
+                image=rng.choice(['', f'products/{i}.jpg']),
+                is_featured=rng.random() < 0.3,
+                stock_quantity=rng.randint(0, 20),
+                low_stock_threshold=rng.randint(0, 8),
+            )
+            for user in rng.sample(users, rng.randint(0, len(users))):
+                Review.objects.create(product=product, user=user, rating=rng.randint(1, 5))
+        self.context = {'request': Request(APIRequestFactory().get('/api/products/'))}
+
+    def test_product_output_matches_drf(self):
+        queryset = Product.objects.select_related('category').prefetch_related('reviews')
+        expected = ProductSerializer(queryset, many=True, context=self.context).data
+        self.assertEqual(CompiledProductSerializer(self.context).to_representation(queryset), expected)
+
+    def test_category_output_matches_drf(self):
+        expected = CategorySerializer(Category.objects.all(), many=True).data
+        self.assertEqual(CompiledCategorySerializer().to_representation(Category.objects.all()), expected)
+
+    def test_endpoints_render_identical_json(self):
+        for name in ['product-list', 'product-featured', 'category-list']:
+            response = self.client.get(reverse(name))
+            serializer_class = CategorySerializer if name == 'category-list' else ProductSerializer
+            queryset = serializer_class.Meta.model.objects.all()
+            if name == 'product-featured':
+                queryset = queryset.filter(is_featured=True, stock_quantity__gt=0)[:6]
+            expected = serializer_class(queryset, many=True, context={'request': response.wsgi_request}).data
+            self.assertEqual(response.content, JSONRenderer().render(expected))
+
+class CatalogCacheCompressionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Shirts', slug='shirts')
+        for i in range(30):
+            Product.objects.create(
+                title=f'Shirt {i}', slug=f'shirt-{i}', category=self.category, price=499,
+                description='Breathable cotton shirt for everyday wear.',
+            )
+        self.url = reverse('product-list')
+
+    def test_list_is_served_from_cache_until_catalog_changes(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+
+        Product.objects.filter(slug='shirt-0').first().save()  # any catalog write bumps the version
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_unknown_params_share_the_cache_entry(self):
+        self.client.get(self.url, {'search': 'shirt', 'category': 'shirts'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'category': 'shirts', 'search': 'shirt', 'x': 'junk'})
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'search': 'shirt', 'category': 'other'})
+
+    @override_settings(CATALOG_VERSION_TIMEOUT=0)
+    def test_version_expires_without_shared_cache(self):
+        # A worker that never saw a bump reseeds from the clock instead of keeping its stale version.
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertIsNotNone(catalog_version())
+        self.assertIsNone(cache.get(CATALOG_VERSION_KEY))
+
+    def test_gzip_negotiation(self):
+        identity = self.client.get(self.url).content
+        for _ in range(2):  # fresh render, then the cached entry's stored variant
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(gzip.decompress(response.content), identity)
+
+    def test_compressed_variant_is_stored_with_cache_entry(self):
+        self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('gzip', cache.get(response.cache_entry.key).variants)
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_accept_encoding_negotiation(self):
+        self.assertEqual(negotiate('gzip;q=0.5, identity'), 'gzip')
+        self.assertEqual(negotiate('gzip;q=0, identity'), None)
+        self.assertEqual(negotiate(''), None)
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], DATABASE_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.token = _replica_alias.set('replica_0')
+
+    def tearDown(self):
+        _replica_alias.reset(self.token)
+
+    def test_replica_reads_and_primary_writes(self):
+        self.assertEqual(self.router.db_for_read(Product), 'replica_0')
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_0', 'api'))
+
+    def test_reads_stay_on_primary_after_a_write_in_the_request(self):
+        def view(request):
+            self.router.db_for_write(Product)
+            self.assertIsNone(self.router.db_for_read(Product))
+            return HttpResponse()
+
+        request = RequestFactory().post('/api/wishlist/', REMOTE_ADDR='10.0.0.1')
+        ReplicaStickinessMiddleware(view)(request)
+        # ...and the client stays pinned to the primary for the stickiness window.
+        self.assertTrue(is_sticky(RequestFactory().get('/api/products/', REMOTE_ADDR='10.0.0.1')))
+        self.assertFalse(is_sticky(RequestFactory().get('/api/products/', REMOTE_ADDR='10.0.0.2')))
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_anonymous_pins_use_the_forwarded_address(self):
+        def view(request):
+            self.router.db_for_write(Product)
+            return HttpResponse()
+
+        balancer = {'REMOTE_ADDR': '10.0.0.254'}
+        request = RequestFactory().post('/api/wishlist/', HTTP_X_FORWARDED_FOR='203.0.113.7', **balancer)
+        ReplicaStickinessMiddleware(view)(request)
+        self.assertTrue(is_sticky(RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.7', **balancer)))
+        self.assertFalse(is_sticky(RequestFactory().get('/', HTTP_X_FORWARDED_FOR='203.0.113.8', **balancer)))
+
+    def test_reads_without_writes_do_not_pin(self):
+        request = RequestFactory().get('/api/products/', REMOTE_ADDR='10.0.0.3')
+        ReplicaStickinessMiddleware(lambda request: HttpResponse())(request)
+        self.assertFalse(is_sticky(request))
+
+    def test_catalog_cache_fills_read_from_primary(self):
+        class ProbeViewSet(CatalogCacheMixin, ReplicaReadMixin, viewsets.ViewSet):
+            permission_classes = ()
+            catalog_cache_actions = ('list',)
+
+            def list(self, request):
+                return Response({'alias': _replica_alias.get()})
+
+        view = ProbeViewSet.as_view({'get': 'list'})
+        # Cache miss: the response is about to be cached, so it must not come from a replica.
+        self.assertEqual(view(APIRequestFactory().get('/probe/')).data, {'alias': None})
+        # Not cacheable (?format=): replica reads are fine.
+        self.assertEqual(view(APIRequestFactory().get('/probe/', {'format': 'json'})).data, {'alias': 'replica_0'})
+
+class DatabaseMetricsTests(APITestCase):
+    class FakeConnection:
+        closed = False
+
+    def test_metrics_recorder(self):
+        metrics = ConnectionMetrics()
+        first, second = self.FakeConnection(), self.FakeConnection()
+        metrics.connection_opened('default', first, ssl=True)
+        metrics.connection_opened('default', second, ssl=False)
+        metrics.checked_out('default', 0.004)
+        metrics.checked_out('default', 0.002)
+        second.closed = True
+        stats = metrics.snapshot()['default']
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['checkout_wait_ms'], {'total': 6.0, 'max': 4.0, 'avg': 3.0})
+        self.assertEqual(stats['connections_opened'], 2)
+        self.assertEqual(stats['ssl_handshakes'], 1)
+        self.assertEqual(stats['open_connections'], 1)
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('database-metrics')
+        self.client.force_authenticate(User.objects.create_user(username='shopper', password='pw'))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(username='ops', password='pw', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['default']['pooled'])
+
+
+class WarmUpTests(APITransactionTestCase):
+    def test_warm_up_builds_plans_and_releases_connections(self):
+        if '_plan' in CompiledProductSerializer.__dict__:
+            del CompiledProductSerializer._plan
+        warm_up()
+        self.assertIn('_plan', CompiledProductSerializer.__dict__)
+        self.assertEqual(self.client.get(reverse('product-list')).status_code, status.HTTP_200_OK)
+
+
+class WarmUpFailureTests(SimpleTestCase):
+    def test_failed_builds_are_logged(self):
+        suggest._index = promotions._compiled = None  # both builds need the (forbidden) database
+        with self.assertLogs('api.warmup', 'ERROR') as logs:
+            warm_up()
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('suggestion index', logs.output[0])
+
+
+class StartupTests(SimpleTestCase):
+    # Generous enough for a loaded CI box; today's cold start is well under a second.
+    BUDGET_SECONDS = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.profile = profile_startup()
+
+    def test_startup_within_budget(self):
+        self.assertLess(self.profile.seconds, self.BUDGET_SECONDS)
+
+    def test_payment_and_media_sdks_are_not_imported_at_startup(self):
+        self.assertIn('api.views', self.profile.modules)
+        for module in ('razorpay', 'cloudinary', 'cloudinary_storage'):
+            self.assertNotIn(module, self.profile.modules)
+
+
+class HealthAndMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_healthz_does_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readyz_reports_each_check(self):
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        checks = response.json()['checks']
+        self.assertEqual(set(checks), {'database:default', 'migrations', 'cache'})
+        self.assertTrue(all(check['ok'] for check in checks.values()))
+        self.assertIn('latency_ms', checks['database:default'])
+
+    def test_readyz_does_not_leak_error_details(self):
+        with mock.patch('api.health._check_cache', side_effect=RuntimeError('redis://admin:pw@10.0.0.5')):
+            with self.assertLogs('api.health', 'ERROR'):
+                response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['checks']['cache'], {'ok': False, 'error': 'check failed'})
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_count_requests_queries_and_cache_hits(self):
+        category = Category.objects.create(name='Tops', slug='tops')
+        Product.objects.create(title='Tee', slug='tee', category=category, price=Decimal('10.00'))
+        self.client.get(reverse('product-list'))
+        self.client.get(reverse('product-list'))
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('http_requests_total{route="product-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="product-list",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_request_db_queries_total{route="product-list",method="GET"}', body)
+        self.assertIn('cache_lookups_total{cache="catalog_response",result="hit"} 1', body)
+        self.assertIn('cache_lookups_total{cache="catalog_response",result="miss"} 1', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_are_staff_only_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_login(User.objects.create_user('ops', 'ops@x.com', 'pass', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_token_bucket_bursts_then_refills(self):
+        class Throttle(TokenBucketThrottle):
+            rate = '3/min'
+            now = 1000.0
+
+            def timer(self):
+                return Throttle.now
+
+            def get_cache_key(self, request, view):
+                return 'throttle:test:client'
+
+        def allowed():
+            return Throttle().allow_request(None, None)
+
+        self.assertEqual([allowed() for _ in range(4)], [True, True, True, False])
+        throttle = Throttle()
+        self.assertFalse(throttle.allow_request(None, None))
+        self.assertEqual(throttle.wait(), 20)
+        Throttle.now += 20  # one token every 20 seconds
+        self.assertEqual([allowed(), allowed()], [True, False])
+        Throttle.now += 3600  # an idle bucket refills to capacity, no further
+        self.assertEqual([allowed() for _ in range(4)], [True, True, True, False])
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login': '2/min',
+    }})
+    def test_login_is_throttled_per_ip_with_retry_after(self):
+        url = reverse('token_obtain_pair')
+        data = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # One token every 30 s, less whatever time the test took.
+        self.assertIn(int(response['Retry-After']), range(25, 31))
+        other = self.client.post(url, data, format='json', REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(other.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login': '2/min',
+    }})
+    def test_forwarded_for_does_not_pick_the_bucket_without_proxies(self):
+        url = reverse('token_obtain_pair')
+        data = {'username': 'nobody', 'password': 'wrong'}
+        statuses = [
+            self.client.post(url, data, format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{n}').status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1, 'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login': '1/min',
+    }})
+    def test_forwarded_for_hop_added_by_the_proxy_picks_the_bucket(self):
+        url = reverse('token_obtain_pair')
+        data = {'username': 'nobody', 'password': 'wrong'}
+        self.client.post(url, data, format='json', HTTP_X_FORWARDED_FOR='spoofed, 203.0.113.1')
+        response = self.client.post(url, data, format='json', HTTP_X_FORWARDED_FOR='other, 203.0.113.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(url, data, format='json', HTTP_X_FORWARDED_FOR='203.0.113.2')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'product-search': '1/min',
+    }})
+    def test_only_product_search_is_scoped(self):
+        url = reverse('product-list')
+        self.assertEqual(self.client.get(url, {'search': 'a'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url, {'search': 'b'}).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url, {'category': 'x'}).status_code, status.HTTP_200_OK)
+
+
+class OrderArchiveTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        category = Category.objects.create(name='Shirts', slug='shirts')
+        self.product = Product.objects.create(title='Tee', slug='tee', category=category, price=10)
+        old = timezone.now() - datetime.timedelta(days=300)
+        self.orders = {}
+        for name, order_status, created_at in [
+            ('old_delivered', 'delivered', old),
+            ('old_canceled', 'canceled', old),
+            ('old_pending', 'pending', old),
+            ('recent_delivered', 'delivered', timezone.now()),
+        ]:
+            order = Order.objects.create(user=self.user, status=order_status, total_amount=20, shipping_city='Pune')
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            OrderItem.objects.create(order=order, product=self.product, size='M', quantity=2, price=10)
+            self.orders[name] = order.pk
+
+    def archive(self):
+        call_command('archive_orders', months=6, batch_size=1, stdout=StringIO())
+
+    def test_months_before_clamps_the_day(self):
+        moment = datetime.datetime(2024, 3, 31, 12, tzinfo=datetime.timezone.utc)
+        self.assertEqual(months_before(moment, 1), moment.replace(month=2, day=29))
+        self.assertEqual(months_before(moment, 15), moment.replace(year=2022, month=12))
+
+    def test_moves_only_old_finished_orders(self):
+        o = self.orders
+        Order.objects.filter(pk=o['old_delivered']).update(total_amount=15, discount_amount=5, coupon_code='SAVE5')
+        self.archive()
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {o['old_pending'], o['recent_delivered']})
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {o['old_delivered'], o['old_canceled']})
+        archived = ArchivedOrder.objects.get(pk=o['old_delivered'])
+        self.assertEqual((archived.status, archived.total_amount, archived.shipping_city), ('delivered', 15, 'Pune'))
+        # Reconciles with the item prices: 2 x 10 less the coupon.
+        self.assertEqual((archived.discount_amount, archived.coupon_code), (5, 'SAVE5'))
+        item = ArchivedOrderItem.objects.get(order=archived)
+        self.assertEqual((item.product_id, item.size, item.quantity, item.price), (self.product.pk, 'M', 2, 10))
+        self.assertEqual(OrderItem.objects.count(), 2)
+
+    def test_archive_endpoint_is_staff_only_and_read_only(self):
+        self.archive()
+        url = reverse('archived-order-list')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user(username='ops', password='pw', is_staff=True))
+        response = self.client.get(url, {'status': 'delivered'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['id'] for order in response.data['results']], [self.orders['old_delivered']])
+        self.assertEqual(response.data['results'][0]['items'][0]['product_title'], 'Tee')
+        self.assertEqual(response.data['results'][0]['discount_amount'], '0.00')
+        self.assertEqual(self.client.post(url, {}).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.get(url, {'user': 'abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'user': self.user.id})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_archived_delivery_still_verifies_reviews(self):
+        Order.objects.filter(pk=self.orders['recent_delivered']).update(status='pending')
+        self.archive()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('review-list'), {'product': self.product.id, 'rating': 4}, format='json')
+        self.assertTrue(response.data['verified_purchase'])
+
+
+class SuggestTests(APITestCase):
+    def setUp(self):
+        # Start from (and leave behind) no process-wide index, so it is built from this test's data.
+        suggest._index = None
+        self.addCleanup(setattr, suggest, '_index', None)
+
+    def test_index_ranks_and_dedupes_prefix_matches(self):
+        index = SuggestionIndex([
+            (CATEGORY, 'Shirts', 1),
+            (PRODUCT, 'Oxford  Shirt', 10),
+            (PRODUCT, 'Linen shirt', 11),
+            (PRODUCT, 'linen SHIRT', 12),  # same text as the one above: dropped
+            (PRODUCT, 'Shorts', 13),
+            (PRODUCT, 'Denim Jacket', 14),
+        ])
+        texts = [s['text'] for s in index.suggest('sh', limit=10)]
+        self.assertEqual(texts, ['Shirts', 'Oxford Shirt', 'Linen shirt', 'Shorts'])
+        self.assertEqual([s['text'] for s in index.suggest('  LINEN sh ')], ['Linen shirt'])
+        self.assertEqual([s['id'] for s in index.suggest('s', limit=2)], [1, 10])
+        self.assertEqual(index.suggest('x'), [])
+        self.assertEqual(index.suggest(''), [])
+
+    def test_database_ranking_and_endpoint(self):
+        category = Category.objects.create(name='Jackets', slug='jackets')
+        Product.objects.create(title='Denim Jacket', slug='denim', category=category, price=50, stock_quantity=3)
+        Product.objects.create(title='Bomber Jacket', slug='bomber', category=category, price=80, is_featured=True, stock_quantity=1)
+        Product.objects.create(title='Rain Jacket', slug='rain', category=category, price=60, stock_quantity=0)
+        texts = [s['text'] for s in SuggestionIndex.from_database().suggest('jac')]
+        self.assertEqual(texts, ['Jackets', 'Bomber Jacket', 'Denim Jacket', 'Rain Jacket'])
+
+        response = self.client.get(reverse('product-suggest'), {'q': 'ja', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['suggestions'], [{'type': 'category', 'text': 'Jackets', 'id': category.id, 'slug': 'jackets'}])
+
+
+@override_settings(ORDER_STREAM_POLL_INTERVAL=0.01, ORDER_STREAM_HEARTBEAT=5, ORDER_STREAM_MAX_SECONDS=5)
+class OrderEventStreamTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='pw')
+        self.order = Order.objects.create(user=self.user, status='delivered')
+        self.url = reverse('order-events', args=[self.order.pk])
+        self.token = str(AccessToken.for_user(self.user))
+
+    def test_status_changes_are_published_after_commit(self):
+        self.order.status = 'shipped'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.save()
+        self.assertEqual(cache.get(order_status_key(self.order.pk))['status'], 'shipped')
+
+    def ticket(self, user, order=None):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse('order-events-ticket', args=[(order or self.order).pk]))
+        self.client.force_authenticate(None)
+        return response
+
+    def test_requires_the_owner_or_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        stranger = User.objects.create_user(username='stranger', password='pw')
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(stranger)}')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.ticket(stranger).status_code, 404)
+
+    def test_tickets_replace_tokens_in_the_url(self):
+        # Access tokens would end up in access logs; only order-bound tickets are accepted there.
+        self.assertEqual(self.client.get(self.url, {'token': self.token}).status_code, 401)
+        other = Order.objects.create(user=self.user, status='delivered')
+        other_ticket = self.ticket(self.user, other).data['ticket']
+        self.assertEqual(self.client.get(self.url, {'ticket': other_ticket}).status_code, 401)
+        self.assertEqual(self.client.get(self.url, {'ticket': other_ticket + 'x'}).status_code, 401)
+        with override_settings(ORDER_STREAM_TICKET_SECONDS=-1):
+            ticket = self.ticket(self.user).data['ticket']
+            self.assertEqual(self.client.get(self.url, {'ticket': ticket}).status_code, 401)
+
+    def test_wsgi_answers_with_a_snapshot_to_poll(self):
+        # A stream would hold a worker thread per open page; the client polls by reconnecting instead.
+        Order.objects.filter(pk=self.order.pk).update(status='processing')
+        response = self.client.get(self.url, {'ticket': self.ticket(self.user).data['ticket']})
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(
+            response.content.decode(),
+            'retry: 10000\nevent: status\ndata: {"order_id": %d, "status": "processing", "payment_verified": false}\n\n'
+            % self.order.pk,
+        )
+
+    async def test_asgi_without_shared_cache_answers_with_a_snapshot(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertFalse(response.streaming)
+        self.assertIn(b'"status": "delivered"', response.content)
+
+    async def test_stream_of_a_deleted_order_ends(self):
+        self.assertEqual([event async for event in _async_events(self.order.pk + 1000)], [])
+
+    @override_settings(SHARED_CACHE=True)
+    async def test_asgi_stream_pushes_published_changes(self):
+        await Order.objects.filter(pk=self.order.pk).aupdate(status='processing')
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        events = aiter(response.streaming_content)
+        self.assertIn(b'"status": "processing"', await anext(events))
+
+        await sync_to_async(publish_order_status)(self.order.pk, 'shipped', True)
+        self.assertIn(b'"status": "shipped", "payment_verified": true', await anext(events))
+        await sync_to_async(publish_order_status)(self.order.pk, 'delivered', True)
+        self.assertIn(b'"status": "delivered"', await anext(events))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(events)
+
+
+def make_rule(id, kind, value, product_id=None, category_id=None, code=None, priority=0,
+              buy_quantity=0, get_quantity=0, min_subtotal=0):
+    return Rule(
+        id=id, name=f'Rule {id}', code=code, kind=kind, value=Decimal(value), product_id=product_id,
+        category_id=category_id, buy_quantity=buy_quantity, get_quantity=get_quantity,
+        min_subtotal=Decimal(min_subtotal), priority=priority,
+    )
+
+
+class PromotionTests(APITestCase):
+    def setUp(self):
+        promotions._compiled = None
+        self.addCleanup(setattr, promotions, '_compiled', None)
+
+    def test_sales_claim_lines_by_priority_and_coupon_stacks(self):
+        compiled = CompiledPromotions([
+            make_rule(1, 'percent', 10, category_id=1),
+            make_rule(2, 'percent', 50, product_id=100, priority=5),
+            make_rule(3, 'bxgy', 100, category_id=2, buy_quantity=2, get_quantity=1),
+            make_rule(4, 'fixed', 30, code='SAVE30', min_subtotal=100),
+        ])
+        lines = [
+            CartLine('a', 100, 1, Decimal('40.00'), 1),  # 50% sale beats the category's 10%
+            CartLine('b', 101, 1, Decimal('20.00'), 2),  # category 10%
+            CartLine('c', 200, 2, Decimal('15.00'), 2),  # buy 2 get 1: one of the 15.00 units free
+            CartLine('d', 201, 2, Decimal('25.00'), 1),
+        ]
+        priced = compiled.apply(lines)
+        self.assertEqual(priced.subtotal, Decimal('135.00'))
+        self.assertEqual(priced.line_discounts, {'a': Decimal('20.00'), 'b': Decimal('4.00'), 'c': Decimal('15.00')})
+        self.assertEqual(priced.total, Decimal('96.00'))
+        self.assertEqual([p.id for p in priced.promotions], [2, 1, 3])
+
+        # The coupon's minimum is checked against the discounted amount: 96 < 100 would fail,
+        # so raise the cart above it and check the 30 off is split across every line.
+        lines.append(CartLine('e', 300, 3, Decimal('10.00'), 1))
+        priced = compiled.apply(lines, 'save30')
+        self.assertEqual(priced.discount, Decimal('39.00') + Decimal('30.00'))
+        self.assertEqual(sum(priced.line_discounts.values()), priced.discount)
+        self.assertEqual(priced.promotions[-1].code, 'SAVE30')
+
+        with self.assertRaisesMessage(InvalidCoupon, 'not valid'):
+            compiled.apply(lines, 'NOPE')
+        with self.assertRaisesMessage(InvalidCoupon, 'does not apply'):
+            compiled.apply(lines[:1], 'SAVE30')
+
+    def test_compiled_set_follows_catalog_version_and_schedule(self):
+        category = Category.objects.create(name='Tees', slug='tees')
+        product = Product.objects.create(title='Tee', slug='tee', category=category, price=Decimal('20.00'))
+        line = CartLine(1, product.id, category.id, product.price, 1)
+        now = timezone.now()
+        Promotion.objects.create(name='Later', kind='percent', value=50, starts_at=now + datetime.timedelta(hours=1))
+        Promotion.objects.create(name='Tee sale', kind='percent', value=25, category=category, ends_at=now + datetime.timedelta(days=1))
+        compiled = promotions.active_promotions()
+        self.assertEqual(len(compiled), 1)
+        self.assertEqual(compiled.valid_until, now + datetime.timedelta(hours=1))
+        self.assertIs(promotions.active_promotions(), compiled)
+        self.assertEqual(promotions.price_cart([line]).discount, Decimal('5.00'))
+
+        Promotion.objects.create(name='Welcome', code=' welcome ', kind='fixed', value=3)
+        self.assertEqual(Promotion.objects.get(name='Welcome').code, 'WELCOME')
+        self.assertIsNot(promotions.active_promotions(), compiled)
+        self.assertEqual(promotions.price_cart([line], 'welcome').total, Decimal('12.00'))
+
+    def test_cart_summary_and_checkout_apply_promotions(self):
+        user = User.objects.create_user(username='shopper', password='pw')
+        self.client.force_authenticate(user=user)
+        category = Category.objects.create(name='Jeans', slug='jeans')
+        product = Product.objects.create(title='Jeans', slug='jeans', category=category, price=Decimal('50.00'), stock_quantity=5)
+        CartItem.objects.create(user=user, product=product, quantity=2)
+        Promotion.objects.create(name='Jeans sale', kind='percent', value=10, product=product)
+        Promotion.objects.create(name='Ten off', code='TEN', kind='fixed', value=10)
+
+        with self.assertNumQueries(2):  # the compiled promotions are loaded once...
+            response = self.client.get(reverse('cart-summary'), {'coupon': 'ten'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ('subtotal', 'discount', 'total', 'coupon')},
+            {'subtotal': '100.00', 'discount': '20.00', 'total': '80.00', 'coupon': 'TEN'},
+        )
+        with self.assertNumQueries(1):  # ...and reused while the catalog version holds
+            self.client.get(reverse('cart-summary'))
+        response = self.client.get(reverse('cart-summary'), {'coupon': 'BOGUS'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data = {'items': [{'product_id': product.id, 'size': 'M', 'quantity': 2}], 'coupon': 'TEN'}
+        response = self.client.post(reverse('order-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        order = Order.objects.get()
+        self.assertEqual((order.total_amount, order.discount_amount, order.coupon_code), (Decimal('80.00'), Decimal('20.00'), 'TEN'))
+        self.assertEqual(order.items.get().price, Decimal('50.00'))
+        response = self.client.post(reverse('order-list'), {**data, 'coupon': 'BOGUS'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('coupon', response.data)
+
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        category = Category.objects.create(name='Shirts & Tops', slug='shirts')
+        Product.objects.create(title='Linen <Shirt>', slug='linen', category=category, price=Decimal('25.00'), stock_quantity=2)
+        Product.objects.create(title='Oxford Shirt', slug='oxford', category=category, price=Decimal('30.00'))
+
+    def test_build_writes_feeds_once_per_catalog_version(self):
+        with self.settings(FEED_ROOT=self.root):
+            manifest = build_feeds()
+            self.assertEqual((manifest['products'], manifest['categories']), (2, 1))
+            with gzip.open(f'{self.root}/products.jsonl.gz', 'rt') as feed:
+                rows = [json.loads(line) for line in feed]
+            self.assertEqual([row['title'] for row in rows], ['Linen <Shirt>', 'Oxford Shirt'])
+            self.assertEqual(rows[0]['link'], 'http://localhost:5173/products/linen')
+            self.assertEqual((rows[0]['price'], rows[0]['in_stock'], rows[1]['in_stock']), ('25.00', True, False))
+            with gzip.open(f'{self.root}/products.xml.gz', 'rt') as feed:
+                xml = feed.read()
+            self.assertIn('<g:title>Linen &lt;Shirt&gt;</g:title>', xml)
+            self.assertIn('<g:price>30.00 INR</g:price><g:availability>out_of_stock</g:availability>', xml)
+            with gzip.open(f'{self.root}/sitemap-1.xml.gz', 'rt') as sitemap:
+                self.assertEqual(sitemap.read().count('<url>'), 3)
+
+            with self.assertNumQueries(0):
+                self.assertIsNone(build_feeds())
+            Product.objects.create(title='Tee', slug='tee', category=Category.objects.get(), price=10)
+            self.assertEqual(build_feeds()['products'], 3)
+            self.assertEqual(read_manifest()['products'], 3)
+
+    def test_middleware_serves_feed_files_without_queries(self):
+        with self.settings(FEED_ROOT=self.root):
+            build_feeds()
+            with self.assertNumQueries(0):
+                response = self.client.get('/feeds/sitemap.xml')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b'http://localhost:8000/feeds/sitemap-1.xml.gz', b''.join(response.streaming_content))
+            response = self.client.get('/feeds/products.jsonl.gz')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 2)
+            self.assertEqual(response['Cache-Control'], f'max-age={settings.FEED_MAX_AGE}, public')
+            self.assertEqual(self.client.get('/feeds/missing.xml').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AuditTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='pw', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        category = Category.objects.create(name='Shoes', slug='shoes')
+        self.product = Product.objects.create(title='Sneaker', slug='sneaker', category=category, price=90, stock_quantity=5)
+
+    def test_changes_are_batched_until_the_batch_closes(self):
+        with audit_batch(actor=self.staff, source='test') as batch:
+            with self.captureOnCommitCallbacks(execute=True):
+                order = Order.objects.create(user=self.customer)
+                order = Order.objects.get(pk=order.pk)
+                order.status = 'shipped'
+                order.save()
+                order.save()  # nothing changed: no event
+                product = Product.objects.get(pk=self.product.pk)
+                product.stock_quantity = 3
+                product.save()
+                try:
+                    with transaction.atomic():
+                        product.stock_quantity = 0
+                        product.save()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+            self.assertFalse(AuditEvent.objects.exists())
+            with self.assertNumQueries(1):
+                batch.flush()
+
+        events = list(AuditEvent.objects.order_by('id').values_list('entity_type', 'action', 'changes', 'actor', 'source'))
+        self.assertEqual(events, [
+            ('order', 'create', {'status': [None, 'pending'], 'payment_verified': [None, False]}, self.staff.id, 'test'),
+            ('order', 'update', {'status': ['pending', 'shipped']}, self.staff.id, 'test'),
+            ('product', 'update', {'stock_quantity': [5, 3]}, self.staff.id, 'test'),
+        ])
+
+    def test_staff_endpoint_filters_by_entity_and_time(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(product=self.product, user=self.customer, rating=4)
+            Review.objects.get().delete()
+            Order.objects.create(user=self.customer)
+        url = reverse('audit-event-list')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(url, {'entity': 'review', 'since': '2000-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['action'] for event in response.data['results']], ['delete', 'create'])
+        self.assertEqual(response.data['results'][0]['changes'], {'rating': [4, None], 'comment': ['', None]})
+        response = self.client.get(url, {'entity': 'review', 'entity_id': review.id, 'action': 'create'})
+        self.assertEqual([event['entity_type'] for event in response.data['results']], ['review'])
+        self.assertEqual(len(self.client.get(url).data['results']), 3)
+        self.assertEqual(self.client.get(url, {'until': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'entity_id': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AuditMiddlewareTests(APITransactionTestCase):
+    # Real commits: on_commit callbacks run inside the request, as in production.
+    def test_request_writes_its_events_in_one_insert(self):
+        staff = User.objects.create_superuser(username='admin', password='pw', email='admin@example.com')
+        category = Category.objects.create(name='Bags', slug='bags')
+        products = [
+            Product.objects.create(title=f'Bag {i}', slug=f'bag-{i}', category=category, price=40, stock_quantity=10)
+            for i in range(3)
+        ]
+        AuditEvent.objects.all().delete()
+        self.client.force_login(staff)
+        data = {'form-TOTAL_FORMS': 3, 'form-INITIAL_FORMS': 3, '_save': 'Save'}
+        for i, product in enumerate(sorted(products, key=lambda p: -p.id)):
+            data.update({f'form-{i}-id': product.id, f'form-{i}-stock_quantity': 2 * i})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:api_product_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "api_auditevent"')]
+        self.assertEqual(len(inserts), 1)
+        events = AuditEvent.objects.all()
+        self.assertEqual(len(events), 3)
+        self.assertEqual({event.actor_id for event in events}, {staff.id})
+        self.assertEqual({event.source for event in events}, {'POST /admin/api/product/'})
+
+
+@override_settings(PAYMENT_SIGNATURE_VERIFIER='api.payments.LocalSignatureVerifier', RAZORPAY_KEY_SECRET='test-secret')
+class LocalPaymentTests(APITestCase):
+    def test_local_verifier_checks_razorpay_signatures(self):
+        user = User.objects.create_user(username='payer', password='pw')
+        order = Order.objects.create(user=user)
+        self.client.force_authenticate(user=user)
+        data = {
+            'order_id': order.id,
+            'razorpay_order_id': 'order_1',
+            'razorpay_payment_id': 'pay_1',
+            'razorpay_signature': sign('order_1', 'pay_1', 'other-secret'),
+        }
+        response = self.client.post(reverse('razorpay-verify'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Signature verification failed'})
+
+        data['razorpay_signature'] = sign('order_1', 'pay_1')
+        response = self.client.post(reverse('razorpay-verify'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'processing')
+
+        # An order canceled (e.g. its reservation expired) is not brought back by a late payment.
+        transition_orders([order.id], 'canceled')
+        response = self.client.post(reverse('razorpay-verify'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_endpoint_stats_percentiles(self):
+        stats = EndpointStats()
+        for ms in range(1, 101):
+            stats.add(ms / 1000, 200 if ms <= 98 else 500, ms > 98)
+        summary = stats.summary(elapsed=10)
+        self.assertEqual((summary['requests'], summary['errors'], summary['throughput_rps']), (100, 2, 10.0))
+        self.assertEqual(summary['latency_ms'], {'mean': 50.5, 'p50': 50.0, 'p90': 90.0, 'p95': 95.0, 'p99': 99.0, 'max': 100.0})
+        self.assertEqual(summary['statuses'], {'200': 98, '500': 2})
+
+    @override_settings(PAYMENT_SIGNATURE_VERIFIER='api.payments.LocalSignatureVerifier', RAZORPAY_KEY_SECRET='test-secret')
+    def test_virtual_users_complete_checkout_flows(self):
+        category = Category.objects.create(name='Caps', slug='caps')
+        products = [
+            Product.objects.create(title=f'Cap {i}', slug=f'cap-{i}', category=category, price=15, stock_quantity=9)
+            for i in range(4)
+        ]
+        catalog = {
+            'products': [product.id for product in products],
+            'categories': ['caps'],
+            'queries': ['ca'],
+            'razorpay_secret': 'test-secret',
+        }
+        # A fixed amount of work rather than a deadline, which sign-up alone may use up on a slow box.
+        report = run_load_test(self.live_server_url, catalog, users=2, ramp_up=0, checkout_ratio=1, iterations_per_user=2)
+        self.assertEqual(report['total']['errors'], 0, report)
+        self.assertEqual(report['iterations'], {'browse': 0, 'checkout': 4, 'failed': 0})
+        self.assertEqual(report['endpoints']['register']['requests'], 2)
+        self.assertEqual(Order.objects.filter(status='processing').count(), report['endpoints']['payment verify']['requests'])
+        self.assertFalse(CartItem.objects.exists())
+
+
+class OrderTransitionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', password='pw', is_staff=True, is_superuser=True)
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        category = Category.objects.create(name='Coats', slug='coats')
+        self.coat = Product.objects.create(title='Coat', slug='coat', category=category, price=100, stock_quantity=10)
+        self.scarf = Product.objects.create(title='Scarf', slug='scarf', category=category, price=20, stock_quantity=10)
+
+    def checkout(self, quantity):
+        self.client.force_authenticate(user=self.customer)
+        data = {'items': [
+            {'product_id': self.coat.id, 'size': 'M', 'quantity': quantity},
+            {'product_id': self.scarf.id, 'size': 'M', 'quantity': 1},
+        ]}
+        response = self.client.post(reverse('order-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Order.objects.get(pk=response.data['id'])
+
+    def stock(self):
+        return list(Product.objects.filter(pk__in=[self.coat.pk, self.scarf.pk]).order_by('id').values_list('stock_quantity', flat=True))
+
+    def test_checkout_reserves_and_cancel_returns_stock_once(self):
+        first, second = self.checkout(2), self.checkout(3)
+        legacy = Order.objects.create(user=self.customer)  # placed before stock was reserved
+        OrderItem.objects.create(order=legacy, product=self.coat, quantity=4, price=100)
+        self.assertTrue(first.stock_reserved)
+        self.assertEqual(self.stock(), [5, 8])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = transition_orders([first.id, second.id, legacy.id], 'canceled')
+        self.assertEqual(sorted(result.updated), sorted([first.id, second.id, legacy.id]))
+        self.assertEqual(self.stock(), [10, 10])
+        self.assertEqual(cache.get(order_status_key(first.id))['status'], 'canceled')
+        self.assertFalse(Order.objects.filter(stock_reserved=True).exists())
+
+        result = transition_orders([first.id], 'canceled')
+        self.assertEqual((result.updated, result.skipped), ([], {first.id: 'canceled'}))
+        self.assertEqual(self.stock(), [10, 10])
+
+    def test_checkout_rejects_short_stock_and_bumps_catalog_only_on_availability_changes(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout(2)
+        self.assertEqual(catalog_version(), version)  # 8 and 9 left: still in stock, not low
+        with self.captureOnCommitCallbacks(execute=True):
+            self.checkout(4)
+        self.assertNotEqual(catalog_version(), version)  # the coat is low on stock now
+        self.assertEqual(self.stock(), [4, 8])
+
+        data = {'items': [{'product_id': self.coat.id, 'size': 'M', 'quantity': 5}]}
+        response = self.client.post(reverse('order-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'], ['Not enough stock of Coat.'])
+        self.assertEqual((self.stock(), Order.objects.count()), ([4, 8], 2))
+
+        response = self.client.get(reverse('product-stock'), {'ids': f'{self.coat.id},{self.scarf.id}'})
+        self.assertEqual([level['stock_quantity'] for level in response.data], [4, 8])
+        self.assertEqual(self.client.get(reverse('product-stock'), {'ids': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        detail = self.client.get(reverse('product-detail', args=[self.coat.id])).data
+        self.assertEqual((detail['in_stock'], detail['low_stock']), (True, True))
+
+    @override_settings(ORDER_RESERVATION_MINUTES=30)
+    def test_unpaid_reservations_expire(self):
+        stale, paid, fresh = self.checkout(4), self.checkout(4), self.checkout(1)
+        transition_orders([paid.id], 'processing')
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        Order.objects.filter(pk__in=[stale.id, paid.id]).update(created_at=an_hour_ago)
+        self.assertEqual(self.stock(), [1, 7])
+
+        # Checkout runs short on coats, so the stale unpaid order gives its four back.
+        order = self.checkout(5)
+        self.assertEqual(Order.objects.get(pk=stale.id).status, 'canceled')
+        self.assertEqual(self.stock(), [0, 7])
+
+        Order.objects.filter(pk=order.id).update(created_at=an_hour_ago)
+        out = StringIO()
+        call_command('release_reservations', stdout=out)
+        self.assertIn('Released 1 order(s)', out.getvalue())
+        self.assertEqual(list(Order.objects.order_by('id').values_list('status', flat=True)),
+                         ['canceled', 'processing', 'pending', 'canceled'])
+        self.assertEqual(self.stock(), [5, 8])
+
+    def test_customer_cancel_and_delete_return_stock(self):
+        order = self.checkout(2)
+        url = reverse('order-detail', args=[order.id])
+        response = self.client.patch(url, {'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(url, {'status': 'canceled'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stock(), [10, 10])
+        self.assertEqual(self.client.patch(url, {'status': 'canceled'}, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stock(), [10, 10])
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.client.patch(url, {'status': 'pending'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        order = self.checkout(3)
+        self.assertEqual(self.client.delete(reverse('order-detail', args=[order.id])).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.stock(), [10, 10])
+        # Shipped goods stay taken when the order is deleted (archive_orders deletes delivered ones).
+        order = self.checkout(1)
+        transition_orders([order.id], 'processing')
+        transition_orders([order.id], 'shipped')
+        Order.objects.get(pk=order.id).delete()
+        self.assertEqual(self.stock(), [9, 9])
+
+    def test_admin_list_editable_cancel_returns_stock(self):
+        order = self.checkout(2)
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:api_order_changelist'), {
+                'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1, '_save': 'Save',
+                'form-0-id': order.id, 'form-0-status': 'canceled',
+            })
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.stock_reserved), ('canceled', False))
+        self.assertEqual(self.stock(), [10, 10])
+        # Logged once, by the transition; saving the rest of the form adds nothing.
+        events = AuditEvent.objects.filter(entity_type='order', entity_id=order.id, action='update')
+        self.assertEqual([event.changes for event in events], [{'status': ['pending', 'canceled']}])
+
+    def test_transitions_are_validated_and_set_based(self):
+        orders = [Order.objects.create(user=self.customer, status=s) for s in ['pending'] * 3 + ['processing', 'shipped']]
+        ids = [order.id for order in orders]
+        with self.assertNumQueries(4):  # savepoint, locking SELECT, UPDATE, release
+            result = transition_orders(ids + [999999], 'processing')
+        self.assertEqual(sorted(result.updated), ids[:3])
+        self.assertEqual(result.skipped, {ids[3]: 'processing', ids[4]: 'shipped'})
+        self.assertEqual(result.missing, [999999])
+        self.assertEqual(Order.objects.filter(status='processing').count(), 4)
+        with self.assertRaises(ValueError):
+            transition_orders(ids, 'lost')
+
+    def test_bulk_status_endpoint_and_admin_action(self):
+        orders = [Order.objects.create(user=self.customer, status='processing') for _ in range(3)]
+        url = reverse('order-bulk-status')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.post(url, {'ids': [orders[0].id], 'status': 'shipped'}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(url, {'ids': [orders[0].id, orders[1].id], 'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['updated']), [orders[0].id, orders[1].id])
+        self.assertEqual(self.client.post(url, {'ids': [orders[0].id], 'status': 'pending'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('admin:api_order_changelist'), {
+            'action': 'mark_delivered', '_selected_action': [order.id for order in orders],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            sorted(Order.objects.values_list('status', flat=True)),
+            ['delivered', 'delivered', 'processing'],
+        )
@@ -0,0 +1,103 @@
+"""
+Token-bucket throttling for the expensive public endpoints.
+
+Rates use DRF's syntax (``"20/min"``): a bucket holds up to 20 tokens and
+refills at 20 per minute, so clients may burst to the full allowance and are
+then held to the refill rate. Each bucket is two cache keys: the tokens used,
+only ever changed with atomic ``incr``/``decr``, and the time of the last
+refill. A refill is claimed with ``cache.add()``, so concurrent workers never
+credit the same interval twice.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# Lifetime of a refill claim; it only has to outlive the refill that follows it.
+REFILL_CLAIM_TIMEOUT = 60
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def get_rate(self):
+        # Read the rates on use (not at import) so per-deployment overrides and tests apply.
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No throttle rate set for the '{self.scope}' scope.")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        capacity, period = self.num_requests, self.duration
+        self.seconds_per_token = period / capacity
+        used_key, refilled_key = f"{self.key}:used", f"{self.key}:refilled"
+
+        self.refilled_at = self.cache.get(refilled_key)
+        if self.refilled_at is None:
+            # New bucket, or one idle long enough to expire: it is full.
+            self.refilled_at = self.now
+            self.cache.add(refilled_key, self.now, period)
+            self.cache.add(used_key, 0, period)
+        else:
+            self._refill(used_key, refilled_key, period)
+
+        try:
+            used = self.cache.incr(used_key)
+        except ValueError:
+            self.cache.add(used_key, 0, period)
+            used = self.cache.incr(used_key)
+        if used <= capacity:
+            return True
+        # Rejected requests don't spend a token.
+        self.cache.decr(used_key)
+        return self.throttle_failure()
+
+    def _refill(self, used_key, refilled_key, period):
+        tokens = int((self.now - self.refilled_at) / self.seconds_per_token)
+        if not tokens or not self.cache.add(f"{refilled_key}:{self.refilled_at!r}", 1, REFILL_CLAIM_TIMEOUT):
+            return
+        # Advance by whole tokens only, so partial progress towards the next one is kept.
+        self.refilled_at += tokens * self.seconds_per_token
+        self.cache.set(refilled_key, self.refilled_at, period)
+        # Other requests may incr concurrently; returning at most what was read never goes below zero.
+        used = self.cache.get(used_key) or 0
+        if used:
+            self.cache.decr(used_key, min(tokens, used))
+        self.cache.touch(used_key, period)
+
+    def wait(self):
+        """Seconds until the next token arrives (sent as ``Retry-After``)."""
+        return max(self.refilled_at + self.seconds_per_token - self.now, 1)
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttle views that set ``throttle_scope``, with the rate configured for that
+    scope in ``DEFAULT_THROTTLE_RATES``. Buckets are per user when authenticated,
+    per client IP otherwise. Views without a scope are not throttled.
+    """
+
+    def __init__(self):
+        # The rate depends on the view, so it is determined in allow_request().
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
@@ -1,28 +1,32 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
+from .streams import order_status_stream
 from .views import (
     CategoryViewSet, 
     ProductViewSet, 
     OrderViewSet, 
+    ArchivedOrderViewSet,
+    AuditEventViewSet,
     ProfileViewSet, 
     UserViewSet, 
     CartItemViewSet, 
     RegisterView,
+    ThrottledTokenObtainPairView,
     RazorpayVerifyView,
     VerifyEmailView,
     ContactMessageViewSet,
     ReviewViewSet,
-    WishlistViewSet
+    WishlistViewSet,
+    DatabaseMetricsView,
 )
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'orders', OrderViewSet, basename='order')
+router.register(r'archived-orders', ArchivedOrderViewSet, basename='archived-order')
+router.register(r'audit-events', AuditEventViewSet, basename='audit-event')
 router.register(r'profile', ProfileViewSet, basename='profile')
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'cart', CartItemViewSet, basename='cart')
@@ -32,10 +36,12 @@ router.register(r'wishlist', WishlistViewSet, basename='wishlist')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('orders/<int:pk>/events/', order_status_stream, name='order-events'),
     # JWT auth endpoints
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', RegisterView.as_view(), name='register'),
     path('verify-email/', VerifyEmailView.as_view(), name='verify-email'),
     path('razorpay/verify/', RazorpayVerifyView.as_view(), name='razorpay-verify'),
+    path('metrics/database/', DatabaseMetricsView.as_view(), name='database-metrics'),
 ]
@@ -2,41 +2,93 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.db import models
-from .models import Category, Product, Order, OrderItem, Profile, CartItem, ContactMessage, Review, Wishlist
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from .models import (
+    Category, Product, Order, OrderItem, Profile, CartItem, ContactMessage, Review, Wishlist,
+    ArchivedOrder, ArchivedOrderItem, AuditEvent,
+)
+from .caching import CatalogCacheMixin
+from .db_metrics import database_metrics
+from .facets import ProductFacets
+from .fast_serializers import CompiledCategorySerializer, CompiledProductSerializer
+from .order_transitions import InvalidTransition, transition_orders, update_order_status
+from .pagination import ArchivedOrderPagination, AuditEventPagination, ReviewPagination
+from .payments import SignatureVerificationError, signature_verifier
+from .promotions import ZERO, CartLine, InvalidCoupon, price_cart
+from .ratings import rating_histogram, summarize
+from .replicas import ReplicaReadMixin
+from .streams import stream_ticket
+from .suggest import suggestion_index
+from .wishlists import wishlisted_product_ids
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
+    LowStockProductSerializer,
     OrderSerializer,
     OrderItemSerializer,
+    ArchivedOrderSerializer,
+    BulkOrderStatusSerializer,
+    AuditEventSerializer,
     ProfileSerializer,
     UserSerializer,
     CartItemSerializer,
     RegisterSerializer,
     ContactMessageSerializer,
     ReviewSerializer,
+    ProductReviewSerializer,
     WishlistSerializer,
+    WishlistContainsSerializer,
 )
-import razorpay
 import uuid
 from django.core.mail import send_mail
 from django.conf import settings
 
 User = get_user_model()
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    catalog_cache_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(CompiledCategorySerializer(self.get_serializer_context()).to_representation(queryset))
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.select_related('category').prefetch_related('reviews').all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    catalog_cache_actions = ('list', 'retrieve', 'featured', 'reviews')
+    # Every param the cached actions read: list filters, ProductFacets and ReviewPagination.
+    catalog_cache_params = (
+        'search', 'category', 'in_stock', 'facets', 'min_price', 'max_price', 'size', 'min_rating',
+        'featured', 'page', 'page_size',
+    )
+
+    @property
+    def throttle_scope(self):
+        # Free-text search scans title/description; cached responses never get this far.
+        return 'product-search' if self.request.query_params.get('search') else None
 
     def get_queryset(self):
+        return self.get_facets().filter(self.get_unfaceted_queryset())
+
+    def get_facets(self):
+        if not hasattr(self, '_facets'):
+            self._facets = ProductFacets(self.request.query_params)
+        return self._facets
+
+    def get_unfaceted_queryset(self):
+        """Search, category and stock filters; the sidebar facet counts are computed over this."""
         queryset = super().get_queryset()
         
         # Search functionality
@@ -60,12 +112,76 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            response = super().list(request, *args, **kwargs)
+        else:
+            # Read-only fast path: same output as ProductSerializer, built from .values() rows
+            queryset = self.filter_queryset(self.get_queryset())
+            response = Response(CompiledProductSerializer(self.get_serializer_context()).to_representation(queryset))
+        # ?facets=true wraps the page with the filter sidebar counts (one extra aggregate query)
+        if request.query_params.get('facets') == 'true':
+            response.data = {
+                'results': response.data,
+                'facets': self.get_facets().counts(self.get_unfaceted_queryset()),
+            }
+        return response
+
     @action(detail=False, methods=['get'], url_path='featured')
     def featured(self, request):
-        featured = self.get_queryset().filter(is_featured=True, stock_quantity__gt=0)[:6]
-        serializer = self.get_serializer(featured, many=True)
+        featured = self.get_queryset().filter(is_featured=True, stock_quantity__gt=0)
+        compiled = CompiledProductSerializer(self.get_serializer_context())
+        return Response(compiled.to_representation(featured[:6]))
+
+    @action(detail=False, methods=['get'], url_path='suggest')
+    def suggest(self, request):
+        """Typeahead: ?q=<prefix>&limit=<n> matched against word starts in titles and category names."""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        query = request.query_params.get('q', '')[:100]
+        return Response({'query': query, 'suggestions': suggestion_index().suggest(query, limit)})
+
+    @action(detail=False, methods=['get'], url_path='stock')
+    def stock(self, request):
+        """
+        Live stock levels for ``?ids=1,2,3`` (up to 100). Not cached: the catalog
+        payloads only carry availability, so they stay cached while orders come in.
+        """
+        ids = request.query_params.get('ids', '').split(',')
+        if not all(product_id.isdigit() for product_id in ids) or len(ids) > 100:
+            raise ValidationError({'ids': 'Enter up to 100 comma-separated product ids.'})
+        levels = Product.objects.filter(pk__in=ids).order_by('id').values('id', 'stock_quantity', 'low_stock_threshold')
+        return Response(list(levels))
+
+    @action(detail=False, methods=['get'], url_path='low-stock', permission_classes=[permissions.IsAdminUser])
+    def low_stock(self, request):
+        """Staff only: products at or below their low stock threshold, lowest stock first."""
+        products = Product.objects.needs_restock().order_by('stock_quantity', 'id')
+        serializer = LowStockProductSerializer(products, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'], url_path='reviews')
+    def reviews(self, request, pk=None):
+        """Paginated review feed with the cached rating histogram: two queries on a cache hit."""
+        product = Product.objects.filter(pk=pk).values('id', 'title').first()
+        if product is None:
+            raise Http404
+        histogram = rating_histogram(product['id'])
+        count, average = summarize(histogram)
+
+        paginator = ReviewPagination(count=count)
+        reviews = Review.objects.filter(product_id=product['id']).select_related('user')
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        response = paginator.get_paginated_response(ProductReviewSerializer(page, many=True).data)
+        response.data.update({
+            'product': product,
+            'average_rating': average,
+            'histogram': histogram,
+        })
+        return response
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.select_related('user').prefetch_related('items__product').all()
@@ -80,6 +196,75 @@ class OrderViewSet(viewsets.ModelViewSet):
             return super().get_queryset()
         return super().get_queryset().filter(user=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[permissions.IsAdminUser])
+    def bulk_status(self, request):
+        """
+        Staff only: ``{"ids": [...], "status": "shipped"}`` moves every listed order that
+        may go to that status (Order.TRANSITIONS) in one UPDATE. Canceling returns stock.
+        """
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = transition_orders(serializer.validated_data['ids'], serializer.validated_data['status'])
+        return Response(result._asdict())
+
+    @action(detail=True, methods=['post'], url_path='events/ticket')
+    def events_ticket(self, request, pk=None):
+        """
+        A short-lived ticket for ``GET /api/orders/<id>/events/?ticket=``, for EventSource
+        clients that can't send the Authorization header.
+        """
+        order = self.get_object()
+        return Response({
+            'ticket': stream_ticket(request.user.pk, order.pk),
+            'expires_in': settings.ORDER_STREAM_TICKET_SECONDS,
+        })
+
+class ArchivedOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """Staff only: orders moved out of the hot tables by ``archive_orders``, newest first."""
+    queryset = ArchivedOrder.objects.select_related('user').prefetch_related('items__product')
+    serializer_class = ArchivedOrderSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = ArchivedOrderPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user_id = self.request.query_params.get('user')
+        if user_id:
+            if not user_id.isdigit():
+                raise ValidationError({'user': 'Enter a whole number.'})
+            queryset = queryset.filter(user_id=user_id)
+        order_status = self.request.query_params.get('status')
+        if order_status:
+            queryset = queryset.filter(status=order_status)
+        return queryset
+
+class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff only: the audit trail, newest first. Filter with ``?entity=order&entity_id=42``,
+    ``?actor=<user id>``, ``?action=update`` and ``?since=`` / ``?until=`` (ISO 8601).
+    """
+    queryset = AuditEvent.objects.select_related('actor')
+    serializer_class = AuditEventSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = AuditEventPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        for param, lookup in (('entity', 'entity_type'), ('entity_id', 'entity_id'), ('actor', 'actor_id'), ('action', 'action')):
+            value = params.get(param)
+            if value:
+                if lookup.endswith('_id') and not value.isdigit():
+                    raise ValidationError({param: 'Enter a whole number.'})
+                queryset = queryset.filter(**{lookup: value})
+        for param, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+            if params.get(param):
+                moment = parse_datetime(params[param])
+                if moment is None:
+                    raise ValidationError({param: 'Enter an ISO 8601 date and time.'})
+                queryset = queryset.filter(**{lookup: moment})
+        return queryset
+
 # ----- Cart endpoints -----
 class CartItemViewSet(viewsets.ModelViewSet):
     """Cart items for the authenticated user. Supports list, create, update (PATCH), and delete."""
@@ -95,9 +280,46 @@ class CartItemViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Cart totals with sales applied, plus the coupon in ``?coupon=`` if given."""
+        rows = self.get_queryset().order_by('added_at', 'id').values_list(
+            'id', 'product_id', 'product__category_id', 'product__price', 'quantity',
+        )
+        lines = [CartLine(*row) for row in rows]
+        coupon = request.query_params.get('coupon', '').strip()
+        try:
+            priced = price_cart(lines, coupon)
+        except InvalidCoupon as exc:
+            return Response({'coupon': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'items': [
+                {
+                    'id': line.key,
+                    'product_id': line.product_id,
+                    'quantity': line.quantity,
+                    'unit_price': str(line.unit_price),
+                    'discount': str(priced.line_discounts.get(line.key, ZERO)),
+                }
+                for line in lines
+            ],
+            'promotions': [
+                {**promotion._asdict(), 'amount': str(promotion.amount)} for promotion in priced.promotions
+            ],
+            'coupon': coupon.upper(),
+            'subtotal': str(priced.subtotal),
+            'discount': str(priced.discount),
+            'total': str(priced.total),
+        })
+
 # ----- User registration -----
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    # Every attempt runs the password hasher, which is deliberately CPU-expensive.
+    throttle_scope = 'login'
+
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
 
     def post(self, request, *args, **kwargs):
         serializer = RegisterSerializer(data=request.data)
@@ -149,31 +371,27 @@ class RazorpayVerifyView(APIView):
     def post(self, request, *args, **kwargs):
         data = request.data
         try:
-            # Initialize Razorpay client
-            # Ensure RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET are in settings.py
-            client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-            
-            # Verify signature
-            params_dict = {
-                'razorpay_order_id': data.get('razorpay_order_id'),
-                'razorpay_payment_id': data.get('razorpay_payment_id'),
-                'razorpay_signature': data.get('razorpay_signature')
-            }
-            
-            # This will raise an error if verification fails
-            client.utility.verify_payment_signature(params_dict)
+            # Raises SignatureVerificationError if verification fails
+            signature_verifier().verify(
+                data.get('razorpay_order_id'),
+                data.get('razorpay_payment_id'),
+                data.get('razorpay_signature'),
+            )
             
             # Update order status
             order_id = data.get('order_id')
             if order_id:
                 order = Order.objects.get(id=order_id, user=request.user)
-                order.status = 'processing' # Mark as paid/processing
-                order.save()
+                # Mark as paid/processing; an order whose reservation expired stays canceled.
+                try:
+                    update_order_status(order, 'processing')
+                except InvalidTransition as exc:
+                    return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
                 return Response({'status': 'Payment verified'}, status=status.HTTP_200_OK)
             else:
                  return Response({'error': 'Order ID missing'}, status=status.HTTP_400_BAD_REQUEST)
 
-        except razorpay.errors.SignatureVerificationError:
+        except SignatureVerificationError:
             return Response({'error': 'Signature verification failed'}, status=status.HTTP_400_BAD_REQUEST)
         except Order.DoesNotExist:
              return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -205,6 +423,11 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]  # Allow anyone to submit
     http_method_names = ['post', 'get', 'patch']  # Only allow POST for public, GET/PATCH for admin
 
+    @property
+    def throttle_scope(self):
+        # Submissions also send an email; the staff-only list/update actions are not limited.
+        return 'contact' if self.action == 'create' else None
+
     def get_queryset(self):
         # Only admins can view all messages
         if self.request.user.is_staff:
@@ -234,7 +457,7 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Product reviews. Users can create, view, update, and delete their own reviews."""
     queryset = Review.objects.select_related('user', 'product').all()
     serializer_class = ReviewSerializer
@@ -249,7 +472,13 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return queryset
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        product = serializer.validated_data['product']
+        # Archived orders still count: archive_orders moves old delivered orders there.
+        verified = (
+            OrderItem.objects.delivered_to(self.request.user, product).exists()
+            or ArchivedOrderItem.objects.delivered_to(self.request.user, product).exists()
+        )
+        serializer.save(user=self.request.user, verified_purchase=verified)
 
     def perform_update(self, serializer):
         # Only allow users to update their own reviews
@@ -275,3 +504,19 @@ class WishlistViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='contains')
+    def contains(self, request):
+        """Which of the given product ids are wishlisted, answered from the cached id set."""
+        serializer = WishlistContainsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        wishlisted = wishlisted_product_ids(request.user.id)
+        product_ids = serializer.validated_data['product_ids']
+        return Response({'wishlisted': [pk for pk in product_ids if pk in wishlisted]})
+
+class DatabaseMetricsView(APIView):
+    """Staff only: connection checkout wait, connection age, SSL handshakes and pool stats."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(database_metrics())
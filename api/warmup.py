@@ -0,0 +1,43 @@
+"""
+Process warm-up run by gunicorn before a process accepts traffic (see gunicorn.conf.py).
+
+With ``preload_app`` it runs once in the master, so everything it builds is
+shared copy-on-write by the forked workers.
+"""
+import logging
+
+from django.db import connections
+from django.urls import get_resolver, reverse
+from rest_framework.settings import api_settings
+
+from .fast_serializers import CompiledCategorySerializer, CompiledProductSerializer
+from .promotions import active_promotions
+from .suggest import suggestion_index
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    # Populate the URL resolver's reverse/namespace dicts (built lazily on first use).
+    get_resolver()._populate()
+    reverse('product-list')
+
+    # Import renderer/parser/authentication classes DRF resolves lazily from settings.
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES'):
+        getattr(api_settings, name)
+
+    # Compile the read-only list serializer plans.
+    CompiledCategorySerializer.get_plan()
+    CompiledProductSerializer.get_plan()
+
+    # Build the typeahead index and compile the live promotions (shared copy-on-write
+    # when preloading). If that fails they are built by the first request instead, which
+    # will likely fail the same way, so it is logged rather than hidden.
+    for name, build in (("suggestion index", suggestion_index), ("promotions", active_promotions)):
+        try:
+            build()
+        except Exception:
+            logger.exception("Warm-up: building the %s failed", name)
+
+    # Never hand a connection opened here to forked workers.
+    connections.close_all()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import metrics
+from .models import Wishlist
+
+
+def _wishlist_key(user_id):
+    return f"wishlist:product_ids:{user_id}"
+
+
+def wishlisted_product_ids(user_id):
+    """Cached set of product ids on a user's wishlist."""
+    key = _wishlist_key(user_id)
+    product_ids = cache.get(key)
+    metrics.cache_lookup("wishlist", product_ids is not None)
+    if product_ids is None:
+        product_ids = frozenset(Wishlist.objects.filter(user_id=user_id).values_list("product_id", flat=True))
+        cache.set(key, product_ids, settings.WISHLIST_CACHE_TIMEOUT)
+    return product_ids
+
+
+def invalidate_wishlist(user_id):
+    cache.delete(_wishlist_key(user_id))
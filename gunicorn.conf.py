@@ -0,0 +1,77 @@
+"""
+Gunicorn configuration, loaded automatically from the working directory.
+
+Every value can be overridden per deployment through the environment:
+
+    WEB_CONCURRENCY               worker processes (default: CPUs + 1, or 2 x CPUs + 1 for sync workers)
+    GUNICORN_THREADS              threads per worker; > 1 uses the gthread worker (default 4)
+    GUNICORN_PRELOAD              import the app in the master and fork (default True)
+    GUNICORN_MAX_REQUESTS         recycle a worker after this many requests (default 1000, 0 disables)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests so workers don't recycle together (default 100)
+    GUNICORN_TIMEOUT              worker timeout in seconds (default 30)
+    GUNICORN_KEEPALIVE            keep-alive seconds (default 5)
+
+``manage.py benchmark_startup`` compares startup time and memory of preloaded
+and non-preloaded workers.
+"""
+import os
+
+
+def _cpu_count():
+    # Respect container CPU affinity rather than the host's core count.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+threads = _env_int('GUNICORN_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+# Threads cover I/O waits, so threaded workers need fewer processes.
+workers = _env_int('WEB_CONCURRENCY', _cpu_count() + 1 if threads > 1 else _cpu_count() * 2 + 1)
+
+# Import Django, DRF, Razorpay, Cloudinary, ... once in the master; workers share
+# those pages copy-on-write instead of each importing its own copy.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = timeout
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = '-'
+errorlog = '-'
+
+
+def _warm_up(log):
+    from api.warmup import warm_up
+
+    warm_up()
+    log.info("Warm-up complete")
+
+
+def when_ready(server):
+    # Runs in the master once the app is preloaded and before any worker is forked.
+    if preload_app:
+        _warm_up(server.log)
+
+
+def post_worker_init(worker):
+    # Without preload every worker imports the app itself; warm it before it accepts.
+    if not preload_app:
+        _warm_up(worker.log)
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes.
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
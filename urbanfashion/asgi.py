@@ -0,0 +1,11 @@
+"""
+ASGI entry point, e.g. for uvicorn or daphne, or gunicorn with an ASGI worker class.
+
+Long-lived streams such as the order status events only hold a connection
+under ASGI; under WSGI each one occupies a worker thread.
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'urbanfashion.settings')
+application = get_asgi_application()
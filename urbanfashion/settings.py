@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 import dj_database_url
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,19 +26,29 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
-    'cloudinary_storage',
-    'cloudinary',
     'api',
 ]
 
+# The Cloudinary apps only contribute template tags and maintenance commands
+# (e.g. deleteorphanedmedia); the media storage is imported by dotted path on
+# first file access. Keep them, and the requests/urllib3 stack they import, off
+# the boot path unless those commands are needed.
+if os.getenv('CLOUDINARY_APPS') == 'True':
+    INSTALLED_APPS += ['cloudinary_storage', 'cloudinary']
+
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.feeds.FeedFilesMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.replicas.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,9 +74,124 @@ TEMPLATES = [
 WSGI_APPLICATION = 'urbanfashion.wsgi.application'
 
 # Database – use dj-database-url to parse DATABASE_URL from Render
+# (SSL is required everywhere except local SQLite files)
 DATABASES = {
-    'default': dj_database_url.config(conn_max_age=600, ssl_require=True)
+    'default': dj_database_url.config(
+        conn_max_age=600,
+        conn_health_checks=True,
+        ssl_require=not os.getenv('DATABASE_URL', '').startswith('sqlite'),
+    )
 }
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    # Concurrent writers (gunicorn threads, the live server in tests) queue for SQLite's
+    # write lock instead of failing with "database is locked". Tests use a file too, as
+    # an in-memory database can't take writes from several threads.
+    DATABASES['default'].setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=20)
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# Read replicas – comma-separated DATABASE_REPLICA_URLS. Catalog reads (categories,
+# products, reviews) are spread across them; see api/replicas.py. Read-your-writes pins
+# live in the cache, so replicas need REDIS_URL. Try it locally with REDIS_URL=redis://...
+# DATABASE_URL=sqlite:///db.sqlite3 DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(','))):
+    replica_url = replica_url.strip()
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(
+        replica_url,
+        conn_max_age=600,
+        conn_health_checks=True,
+        ssl_require=not replica_url.startswith('sqlite'),
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Seconds a client keeps reading from the primary after a write (read-your-writes)
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', '10'))
+
+# Connection pooling – DATABASE_POOL=True switches PostgreSQL databases from persistent
+# per-thread connections to Django's native psycopg 3 pool (Django 5.1+), one pool per
+# worker process shared by its threads. Connections are health-checked on checkout in
+# both modes (CONN_HEALTH_CHECKS). PostgreSQL goes through a thin backend subclass that
+# records checkout wait, connection age and SSL handshakes (GET /api/metrics/database/).
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'False') == 'True'
+for database in DATABASES.values():
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    database['ENGINE'] = 'api.db_backends.postgresql'
+    if DATABASE_POOL:
+        database['CONN_MAX_AGE'] = 0  # the pool owns connection lifetime
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+            'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', '1800')),
+        }
+
+# Cache – shared Redis when REDIS_URL is set so every worker sees the same cached
+# aggregates; falls back to per-process local memory for development
+SHARED_CACHE = bool(os.getenv('REDIS_URL'))
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    if DATABASE_REPLICAS:
+        # A client pinned to the primary by one worker would read stale replica data on the next.
+        raise ImproperlyConfigured('DATABASE_REPLICA_URLS requires a shared cache (REDIS_URL).')
+
+# Seconds a user's cached wishlist membership set is kept. Edits only clear the copy in
+# the cache they were made through, so without a shared cache other workers may answer
+# from a stale set until it expires.
+WISHLIST_CACHE_TIMEOUT = int(os.getenv('WISHLIST_CACHE_TIMEOUT', 60 * 60 * 24 if SHARED_CACHE else 30))
+
+# Seconds the catalog version (api/catalog.py) lives without a shared cache. A bump only
+# reaches the worker that made the edit, so each worker re-seeds its version this often;
+# cached catalog responses, the suggestion index and the compiled promotions are at most
+# this stale. With a shared cache the version never expires.
+CATALOG_VERSION_TIMEOUT = None if SHARED_CACHE else int(os.getenv('CATALOG_VERSION_TIMEOUT', '30'))
+
+# gzip/brotli for JSON API responses of at least this many bytes
+API_COMPRESSION_MIN_SIZE = int(os.getenv('API_COMPRESSION_MIN_SIZE', '1024'))
+
+# Minimum seconds between rebuilds of a process's product suggestion index
+SUGGEST_REBUILD_INTERVAL = int(os.getenv('SUGGEST_REBUILD_INTERVAL', '10'))
+
+# Order status event stream (/api/orders/<id>/events/): cache poll interval, keep-alive
+# comment interval and maximum stream length in seconds (clients reconnect after it).
+# Streams need ASGI and a shared cache; under WSGI (the Procfile's gunicorn) or LocMem the
+# endpoint returns the current status and clients poll every
+# ORDER_STREAM_SNAPSHOT_RETRY_SECONDS. Stream tickets (?ticket=) expire after
+# ORDER_STREAM_TICKET_SECONDS.
+ORDER_STREAM_POLL_INTERVAL = float(os.getenv('ORDER_STREAM_POLL_INTERVAL', '1'))
+ORDER_STREAM_HEARTBEAT = int(os.getenv('ORDER_STREAM_HEARTBEAT', '15'))
+ORDER_STREAM_MAX_SECONDS = int(os.getenv('ORDER_STREAM_MAX_SECONDS', '300'))
+ORDER_STREAM_SNAPSHOT_RETRY_SECONDS = int(os.getenv('ORDER_STREAM_SNAPSHOT_RETRY_SECONDS', '10'))
+ORDER_STREAM_TICKET_SECONDS = int(os.getenv('ORDER_STREAM_TICKET_SECONDS', '300'))
+
+# Minutes checkout holds stock for an order that isn't paid yet; release_reservations
+# (run it from cron) cancels pending, unpaid orders past this and puts their stock back
+ORDER_RESERVATION_MINUTES = int(os.getenv('ORDER_RESERVATION_MINUTES', '30'))
+
+# archive_orders moves delivered/canceled orders older than this into the archive tables
+ORDER_ARCHIVE_AFTER_MONTHS = int(os.getenv('ORDER_ARCHIVE_AFTER_MONTHS', '6'))
+
+# Razorpay credentials, and who checks payment signatures (api/payments.py)
+RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID', '')
+RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET', '')
+PAYMENT_SIGNATURE_VERIFIER = 'api.payments.RazorpaySignatureVerifier'
+
+# Prometheus scrapes /metrics with "Authorization: Bearer <METRICS_TOKEN>"; otherwise it
+# is open to staff sessions only
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -84,23 +210,59 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Media files (product images) – Cloudinary storage
+# Media files (product images) – Cloudinary storage when it is configured, local files
+# under MEDIA_ROOT otherwise (development, tests)
 MEDIA_URL = '/media/'
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+MEDIA_ROOT = BASE_DIR / 'media'
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'cloudinary_storage.storage.MediaCloudinaryStorage' if os.getenv('CLOUDINARY_CLOUD_NAME')
+            else 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
     'API_KEY': os.getenv('CLOUDINARY_API_KEY'),
     'API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
 }
 
+# Product feeds and sitemaps written by `manage.py build_feeds` and served from
+# FEED_URL (see api/feeds.py). Links point at the storefront (SITE_URL); sitemap
+# chunk and image links at this API's public URL (API_URL).
+FEED_ROOT = Path(os.getenv('FEED_ROOT', BASE_DIR / 'feeds'))
+FEED_URL = '/feeds/'
+FEED_MAX_AGE = int(os.getenv('FEED_MAX_AGE', '3600'))
+FEED_CURRENCY = os.getenv('FEED_CURRENCY', 'INR')
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:5173')
+SITE_PRODUCT_PATH = os.getenv('SITE_PRODUCT_PATH', '/products/{slug}')
+SITE_CATEGORY_PATH = os.getenv('SITE_CATEGORY_PATH', '/categories/{slug}')
+API_URL = os.getenv('API_URL', 'http://localhost:8000')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS – allow all origins (adjust for production as needed)
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Token-bucket limits per throttle scope: "<requests>/<s|min|hour|day>", allowing
+# bursts of up to <requests>. Override per deployment, e.g.
+# THROTTLE_RATES="login=20/min,contact=10/hour".
+THROTTLE_RATES = {
+    'login': '10/min',
+    'register': '5/hour',
+    'contact': '5/hour',
+    'product-search': '60/min',
+}
+THROTTLE_RATES.update(
+    item.strip().split('=', 1) for item in os.getenv('THROTTLE_RATES', '').split(',') if item.strip()
+)
+
 # DRF + JWT configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -109,4 +271,23 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # orjson-backed JSON when installed (same output as DRF's stdlib JSON apart from float spelling)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Only views that set throttle_scope are throttled
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.ScopedTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': THROTTLE_RATES,
+    # Reverse proxies in front of the app (1 on Render). Anonymous throttle buckets are keyed
+    # on the address this many hops back in X-Forwarded-For; 0 uses REMOTE_ADDR and ignores
+    # the client-supplied header.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1' if os.getenv('RENDER') else '0')),
 }
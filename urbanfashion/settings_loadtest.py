@@ -0,0 +1,62 @@
+"""
+Settings for local load tests (``manage.py loadtest``): the production settings
+with every external service replaced by a local stand-in.
+
+- Razorpay: signatures are checked locally (api.payments.LocalSignatureVerifier)
+  against LOADTEST_RAZORPAY_SECRET; the load test signs its payments with it.
+- Email: verification mails are discarded (dummy backend).
+- Media: stored on local disk under loadtest/media instead of Cloudinary.
+- Throttling: off, so many virtual users can log in and search from one address.
+
+The load test migrates, seeds and tops up stock, so it never uses DATABASE_URL
+or the read replicas. The database is LOADTEST_DATABASE_URL when set (use a
+scratch PostgreSQL database for meaningful numbers), otherwise a SQLite file
+under loadtest/.
+"""
+import os
+
+import dj_database_url
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, REST_FRAMEWORK
+
+LOADTEST = True
+LOADTEST_ROOT = BASE_DIR / 'loadtest'
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+
+if os.getenv('LOADTEST_DATABASE_URL'):
+    DATABASES = {'default': dj_database_url.parse(os.getenv('LOADTEST_DATABASE_URL'), conn_max_age=600)}
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        DATABASES['default']['ENGINE'] = 'api.db_backends.postgresql'
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': LOADTEST_ROOT / 'db.sqlite3',
+            # Concurrent writers wait for the lock instead of failing at once.
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 30},
+        },
+    }
+DATABASE_REPLICAS = []
+
+RAZORPAY_KEY_ID = 'rzp_loadtest'
+RAZORPAY_KEY_SECRET = os.getenv('LOADTEST_RAZORPAY_SECRET', 'loadtest-secret')
+PAYMENT_SIGNATURE_VERIFIER = 'api.payments.LocalSignatureVerifier'
+
+EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
+DEFAULT_FROM_EMAIL = 'loadtest@localhost'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': LOADTEST_ROOT / 'media'},
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+FEED_ROOT = LOADTEST_ROOT / 'feeds'
+
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': ()}